@@ -144,6 +144,27 @@ class Person(odm.StdModel):
     group = odm.ForeignKey(Group)
 
 
+class SortedPerson(odm.StdModel):
+    '''Same as :class:`Person` with sort indexes on ``age`` and on the
+name of the ``group``.'''
+    name = odm.SymbolField()
+    age = odm.IntegerField()
+    group = odm.ForeignKey(Group, related_name='sorted_people')
+
+    class Meta:
+        sort_indexes = ('age', 'group__name')
+
+
+class Customer(odm.StdModel):
+    '''A model with a compound index on ``country`` and ``status``.'''
+    name = odm.SymbolField()
+    country = odm.SymbolField()
+    status = odm.SymbolField()
+
+    class Meta:
+        indexes = [('country', 'status')]
+
+
 # A model for testing a recursive foreign key
 class Node(odm.StdModel):
     parent = odm.ForeignKey('self', required = False, related_name = 'children')
@@ -243,6 +264,23 @@ class NumericData(odm.StdModel):
     ok = odm.BooleanField()
 
 
+class NumericIndexData(odm.StdModel):
+    '''Same as :class:`NumericData` with range indices on ``pv`` and
+``vega``.'''
+    pv = odm.FloatField(index=True)
+    vega = odm.FloatField(default=0.0, index=True)
+    delta = odm.FloatField(default=1.0)
+    gamma = odm.FloatField(required=False)
+    data = odm.JSONField(as_string=False)
+    ok = odm.BooleanField()
+
+
+class PrefixData(odm.StdModel):
+    '''Model with lexicographic prefix indices.'''
+    name = odm.SymbolField(prefix_index=True)
+    description = odm.CharField(prefix_index=True)
+
+
 class DateData(odm.StdModel):
     dt1 = odm.DateField(required = False)
     dt2 = odm.DateTimeField(default=datetime.now)
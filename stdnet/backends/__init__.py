@@ -17,6 +17,7 @@ __all__ = ['BackendRequest',
            'session_result',
            'instance_session_result',
            'query_result',
+           'query_step',
            'on_result',
            'range_lookups',
            'lookup_value',
@@ -33,6 +34,9 @@ instance_session_result = namedtuple('instance_session_result',
 session_result = namedtuple('session_result','meta results')
 
 lookup_value = namedtuple('lookup_value', 'lookup value')
+# a step of a query execution plan. size is the size of the key after the
+# step and time the server time, in seconds, it took.
+query_step = namedtuple('query_step', 'command key args size time')
 
 pass_through = lambda x: x
 str_lower_case = lambda x: to_string(x).lower()
@@ -191,6 +195,14 @@ queries specified by :class:`stdnet.odm.Query`.
     def items(self, slic):
         return on_result(self.execute_query(), self._get_items, slic)
     
+    def iterator(self, batch_size):
+        '''Generator of lists of at most *batch_size* instances matching
+the query. Backends can override this method to load the data in a more
+efficient way.'''
+        N = self.execute_query()
+        for start in range(0, N, batch_size):
+            yield self.items(slice(start, start+batch_size))
+    
     def execute_query(self):
         if not self.executed:
             return on_result(self._execute_query(), self._got_count)
@@ -212,6 +224,39 @@ queries specified by :class:`stdnet.odm.Query`.
  be implemented by data-server backends.'''
         raise NotImplementedError()
     
+    def update(self, fields):       # pragma: no cover
+        '''Update *fields*, a dictionary of values keyed by
+:class:`stdnet.odm.Field`, for all elements in the query without loading
+them. Return the number of updated elements.'''
+        raise NotImplementedError()
+    
+    def increment(self, field, by):     # pragma: no cover
+        '''Increment the numeric *field*, a :class:`stdnet.odm.Field`, by
+*by* for all elements in the query without loading them. Return a dictionary
+mapping the ids of the incremented elements to the new values.'''
+        raise NotImplementedError()
+    
+    def summarize(self, fields, group_by=None):     # pragma: no cover
+        '''Aggregate *fields*, a list of :class:`stdnet.odm.Field`, for all
+elements in the query without loading them. Return a list with an entry for
+each value of the *group_by* field, or one entry if *group_by* is ``None``.
+An entry is a tuple containing the group value, the number of elements and,
+for each field, a tuple with the number of values, their sum, minimum and
+maximum.'''
+        raise NotImplementedError()
+    
+    def facets(self, fields, top=None):     # pragma: no cover
+        '''Count the elements in the query for each value of *fields*, a
+list of indexed :class:`stdnet.odm.Field`. Return a list with an entry for
+each field, a list of ``(value, count)`` pairs sorted by decreasing count
+with at most *top* pairs.'''
+        raise NotImplementedError()
+    
+    def explain(self):      # pragma: no cover
+        '''The execution plan of the query as a list of
+:class:`stdnet.backends.query_step`.'''
+        raise NotImplementedError()
+    
     # PRIVATE
     def _got_count(self, c):
         self.__count = c
@@ -365,8 +410,12 @@ from database.
                 related_data.append((field, related, multi))
         for state in data:
             instance = make_object()
+            # the data as loaded, for committing changed fields only. Copied
+            # since __setstate__ pops the field values from state data.
+            loaded = dict(state[2])
             instance.__setstate__(state)
             instance._dbdata[instance._meta.pkname()] = instance.pkvalue()
+            instance._dbdata['loaded'] = loaded
             for field, rdata, multi in related_data:
                 if multi:
                     field.set_cache(instance, rdata.get(str(instance.id)))
@@ -434,6 +483,32 @@ must return a instance of the backend handler.'''
         '''Execute a :class:`stdnet.odm.Session` in the backend server.'''
         raise NotImplementedError()
     
+    def bulk_create(self, meta, instances):
+        '''Add a list of new and validated *instances* of model *meta* to
+the backend server without a :class:`stdnet.odm.Session`. Used by
+:meth:`stdnet.odm.Manager.bulk_create`, it must return the list of ids
+of the new instances.'''
+        raise NotImplementedError()
+    
+    def get_many(self, meta, ids, fields=None, field=None):
+        '''Load instances of model *meta* from a list of *ids*. Used by
+:meth:`stdnet.odm.Manager.get_many`, it must return a list with the
+instances in the order of *ids* and ``None`` for ids which are not
+in the backend server. If *fields* are given, only those fields are
+loaded. If *field* is given, *ids* are values of the unique
+field with attribute name *field*.'''
+        raise NotImplementedError()
+    
+    def get_or_create(self, meta, instance, lookups):
+        '''Get the instance of model *meta* matching *lookups*, a list of
+attribute name and value pairs of the primary key, unique fields or indexed
+fields, or add the new and validated *instance* if there is none. Used by
+:meth:`stdnet.odm.Session.get_or_create` outside transactions, it must
+perform the operation atomically and return a two elements tuple
+containing the instance and a boolean indicating if it was created.
+Backends which cannot do it return ``None``.'''
+        return None
+    
     def model_keys(self, meta):
         '''Return a list of database keys used by model *model*'''
         raise NotImplementedError()
@@ -7,20 +7,37 @@ from functools import partial
 from collections import namedtuple
 
 import stdnet
-from stdnet import FieldValueError, CommitException, QuerySetError
-from stdnet.utils import to_string, map, gen_unique_id, zip,\
-                             native_str, flat_mapping, unique_tuple
+from stdnet import FieldValueError, CommitException, QuerySetError,\
+                   ImproperlyConfigured
+from stdnet.utils import to_string, to_bytes, map, gen_unique_id, zip,\
+                             native_str, flat_mapping, unique_tuple, iteritems
 from stdnet.lib import redis
 from stdnet.backends import BackendStructure, query_result, session_result,\
-                            instance_session_result, on_result, range_lookups
+                            instance_session_result, on_result, range_lookups,\
+                            query_step, BackendRequest
 
 pairs_to_dict = redis.pairs_to_dict
 MIN_FLOAT =-1.e99
+# result of a query counted and loaded in one script call
+loaded_query = namedtuple('loaded_query', 'count items')
+# result of a query update
+updated_query = namedtuple('updated_query', 'count errors')
+# result of a query increment
+incremented_query = namedtuple('incremented_query', 'values errors')
+# result of a query summary
+summarized_query = namedtuple('summarized_query', 'groups')
+# result of a query facets
+faceted_query = namedtuple('faceted_query', 'counts')
+# result of a get_or_create
+got_or_created = namedtuple('got_or_created', 'created result')
 
 ################################################################################
 #    prefixes for data
 OBJ = 'obj'     # the hash table for a instance
 TMP = 'tmp'     # temorary key
+SRT = 'srt'     # sort index
+MAT = 'mat'     # materialized query
+GEN = 'gen'     # generation of model data
 ODM_SCRIPTS = ('odmrun', 'move2set', 'zdiffstore')
 ################################################################################
 
@@ -72,9 +89,61 @@ class odmrun(redis.RedisScript):
             return session_result(meta, res)
         elif script == 'load':
             return self.load_query(request, response, backend, meta, **options)
+        elif script == 'get':
+            return self._get(request, response, backend, meta, **options)
+        elif script == 'get_or_create':
+            return self._get_or_create(request, response, backend, meta)
+        elif script == 'update':
+            errors = [e.decode(request.encoding) for e in response[1:]]
+            return updated_query(response[0], errors)
+        elif script == 'increment':
+            values, errors = response
+            errors = [e.decode(request.encoding) for e in errors]
+            return incremented_query(list(zip(values[::2], values[1::2])),
+                                     errors)
+        elif script == 'summarize':
+            return summarized_query(list(self._summary(request, response)))
+        elif script == 'facets':
+            return faceted_query([[(v.decode(request.encoding), c) for v, c\
+                                   in zip(r[::2], r[1::2])] for r in response])
+        elif script == 'materialized':
+            return response[0].decode(request.encoding), response[1]
         else:
             return response
         
+    def _summary(self, request, response):
+        for row in response:
+            value = row[0].decode(request.encoding) or None
+            stats = []
+            for n in range(2, len(row), 4):
+                min, max = row[n+2:n+4]
+                stats.append((row[n], float(row[n+1]),
+                              min.decode(request.encoding) if min else None,
+                              max.decode(request.encoding) if max else None))
+            yield value, row[1], stats
+        
+    def _get(self, request, response, backend, meta, size=0, **options):
+        # instances in the requested order, with None for missing ids
+        missing = set(response[2])
+        items = iter(self.load_query(request, response, backend, meta,
+                                     **options))
+        return [None if n in missing else next(items) for n in range(size)]
+        
+    def _get_or_create(self, request, response, backend, meta):
+        if int(response[0]):
+            id, flag, info = response[1]
+            if int(flag):
+                return got_or_created(True, id)
+            msg = info.decode(request.encoding)
+            return got_or_created(True, CommitException(msg))
+        ids = response[1]
+        if len(ids) > 1:
+            return got_or_created(False, QuerySetError('get_or_create '
+                                  'matched {0} instances'.format(len(ids))))
+        data = self.build(((ids[0], response[2]),), meta, None, None,
+                          request.client.encoding)
+        return got_or_created(False, backend.objects_from_db(meta, data)[0])
+        
     def _wrap_commit(self, request, response, iids=None, **options):
         for id, iid in zip(response, iids):
             id, flag, info = id
@@ -85,12 +154,13 @@ class odmrun(redis.RedisScript):
                 yield CommitException(msg)
     
     def load_query(self, request, response, backend, meta, get=None,
-                   fields=None, fields_attributes=None, **options):
+                   fields=None, fields_attributes=None, count=False,
+                   cursor=None, **options):
         if get:
             tpy = field_decoder(meta, get)
             return [tpy(v) for v in response]
         else:
-            data, related = response
+            data, related = response[0], response[1]
             encoding = request.client.encoding
             data = self.build(data, meta, fields, fields_attributes, encoding)
             related_fields = {}
@@ -100,7 +170,13 @@ class odmrun(redis.RedisScript):
                     fields = tuple(native_str(f, encoding) for f in fields)
                     related_fields[fname] =\
                         self.load_related(meta, fname, rdata, fields, encoding)
-            return backend.objects_from_db(meta, data, related_fields)
+            items = backend.objects_from_db(meta, data, related_fields)
+            if count:
+                return loaded_query(response[2], items)
+            elif cursor is not None:
+                return native_str(response[2], encoding), items
+            else:
+                return items
     
     def build(self, response, meta, fields, fields_attributes, encoding):
         _ = field_decoder(meta)
@@ -156,6 +232,24 @@ def results_and_erros(results, result_type):
                                       isinstance(v, result_type)]
     else:
         return ()
+
+
+def merge_session_results(results):
+    '''Merge the :class:`stdnet.session_result` of a model committed in
+several script calls into one result.'''
+    merged = []
+    positions = {}
+    for result in results:
+        if isinstance(result, session_result):
+            index = positions.get(result.meta)
+            if index is not None:
+                meta, res = merged[index]
+                merged[index] = session_result(meta,
+                                               chain(res, result.results))
+                continue
+            positions[result.meta] = len(merged)
+        merged.append(result)
+    return merged
                 
 
 def redis_execution(pipe, result_type):
@@ -165,12 +259,40 @@ def redis_execution(pipe, result_type):
     return info, on_result(results, results_and_erros, result_type)
     
     
+def command_info(command):
+    '''Name, key and arguments of a pipeline *command*. For scripts the name
+is the script name and the key is the first of the script keys.'''
+    name, args, options = command.command, command.args, command.options
+    key = args[0] if args else None
+    if name in ('EVAL', 'EVALSHA'):
+        num_keys = args[1]
+        keys, args = args[2:2+num_keys], args[2+num_keys:]
+        name = options.get('script_name') or name
+        if options.get('script'):
+            # an odmrun script, skip the script name and the meta
+            name = '%s.%s' % (name, options['script'])
+            args = args[2:]
+        key = keys[0] if keys else None
+        args = tuple(keys[1:]) + tuple(args)
+    elif name == 'SORT' and 'STORE' in args:
+        key = args[args.index('STORE')+1]
+    else:
+        args = args[1:]
+    return name, key, args
+
+
+def server_time(start, end):
+    '''Seconds between two ``TIME`` responses.'''
+    return int(end[0]) - int(start[0]) + (int(end[1]) - int(start[1]))/1.e6
+    
+    
 ################################################################################
 ##    REDIS QUERY CLASS
 ################################################################################
 class RedisQuery(stdnet.BackendQuery):
     card = None
     _meta_info = None
+    _building = None
     script_dep = {'script_dependency': ('build_query','move2set')}
     
     def zism(self, r):
@@ -189,23 +311,40 @@ class RedisQuery(stdnet.BackendQuery):
         # Accumulate a query
         self.pipe = pipe if pipe is not None else self.backend.client.pipeline()
         qs = self.queryelem
+        materialize = None if qs._get_field else qs.data.get('materialize')
+        if materialize:
+            result = self._materialized_key()
+            if not isinstance(result, BackendRequest):
+                self._build_query(result, materialize)
+            elif pipe is None:
+                # asynchronous connection, the query is built once the
+                # materialized key has been checked
+                self._building = result.add_callback(
+                            partial(self._build_query, materialize=materialize))
+            else:
+                # a nested query is needed by its parent straight away
+                self._build_query()
+        else:
+            self._build_query()
+            
+    def _build_query(self, materialized=None, materialize=None):
+        self._building = None
+        qs = self.queryelem
         pipe = self.pipe
         backend = self.backend
-        key, meta, keys, args = None, self.meta, [], []
+        key, meta, keys = None, self.meta, []
         pkname = meta.pkname()
-        for child in qs:
-            if getattr(child, 'backend', None) == backend:
-                lookup, value = 'set', child
-            else:
-                lookup, value = child
-            if lookup == 'set':
-                be = value.backend_query(pipe=pipe)
-                keys.append(be.query_key)
-                args.extend(('set', be.query_key))
-            else:
-                args.extend((lookup, '' if value is None else value))
         temp_key = True
-        if qs.keyword == 'set':
+        if materialize:
+            matkey, cached = materialized
+            if cached:
+                self.query_key = matkey
+                self.temporary = False
+                return
+        if qs.keyword == 'intersect':
+            key = self._build_intersect(keys)
+        elif qs.keyword == 'set':
+            args = self._lookup_args(qs, keys)
             if qs.name == pkname and not args:
                 key = backend.basekey(meta, 'id')
                 temp_key = False
@@ -215,13 +354,12 @@ class RedisQuery(stdnet.BackendQuery):
                 backend.odmrun(pipe, 'query', meta, keys, self.meta_info,
                                qs.name, *args)
         else:
+            self._lookup_args(qs, keys)
             key = backend.tempkey(meta)
             p = 'z' if meta.ordering else 's'
             pipe.script_call('move2set', keys, p,
                              scripts_dependency=ODM_SCRIPTS)
-            if qs.keyword == 'intersect':
-                command = getattr(pipe, p+'interstore')
-            elif qs.keyword == 'union':
+            if qs.keyword == 'union':
                 command = getattr(pipe, p+'unionstore')
             elif qs.keyword == 'diff':
                 command = getattr(pipe, p+'diffstore')
@@ -250,12 +388,113 @@ class RedisQuery(stdnet.BackendQuery):
             pipe.sort(bkey, by='nosort', get=okey, store=key)
             self.card = getattr(pipe, 'llen')
         if temp_key:
-            pipe.expire(key, self.expire)
+            if materialize:
+                backend.odmrun(pipe, 'materialize', meta, (key, matkey),
+                               self.meta_info, materialize)
+                key, temp_key = matkey, False
+            else:
+                pipe.expire(key, self.expire)
         self.query_key = key
-    
-    def _execute_query(self):
-        '''Execute the query without fetching data. Returns the number of
-elements in the query.'''
+        self.temporary = temp_key
+    
+    def items(self, slic):
+        # When the query has not been executed yet, the query is built,
+        # counted and loaded in one round trip to the server.
+        if self._building is not None:
+            return self._when_built(self.items, slic)
+        if self.executed or self.queryelem._get_field:
+            return super(RedisQuery, self).items(slic)
+        values = None if slic else self._unique_values()
+        if values:
+            field = self.queryelem.name
+            if field == self.meta.pkname():
+                field = None
+            result = self.backend.get_many(self.meta, values,
+                                           self.queryelem.fields, field)
+            return on_result(result, self._unique_items)
+        else:
+            return self._items(slic)
+    
+    def _unique_values(self):
+        # The values of a query which only matches the primary key or a
+        # unique field. These queries are loaded directly with the get
+        # script, without building a temporary set of ids.
+        qs, meta = self.queryelem, self.meta
+        if qs.keyword != 'set' or any((qs.data.get(name) for name in\
+                ('ordering', 'select_related', 'where', 'seek', 'materialize'))):
+            return
+        if qs.name != meta.pkname() and not any((f.unique for f in\
+                    meta.indices if f.attname == qs.name)):
+            return
+        values = []
+        for child in qs:
+            if getattr(child, 'backend', None) == self.backend:
+                return
+            lookup, value = child
+            if lookup != 'value' or value is None:
+                return
+            values.append(value)
+        values = unique_tuple(values)
+        # more than one instance must be sorted by the model ordering
+        if meta.ordering and len(values) > 1:
+            return
+        return values
+    
+    def _unique_items(self, items):
+        if isinstance(items, Exception):
+            raise items
+        return [item for item in items if item is not None]
+    
+    def iterator(self, batch_size):
+        '''Generator of lists of at most *batch_size* instances. Queries
+sorted by the model ordering are loaded in ``ZRANGE`` windows while unsorted
+queries are loaded with ``SSCAN``, or all at once with ``SMEMBERS`` if the
+server is older than redis 2.8. Explicitly sorted queries are loaded
+in ``SORT`` windows.'''
+        if self.queryelem.data.get('seek'):
+            # windows relative to the bound of a keyset pagination
+            start = 0
+            while True:
+                items = self.items(slice(start, start + batch_size))
+                if items:
+                    yield items
+                if len(items) < batch_size:
+                    break
+                start += batch_size
+        elif self.queryelem._get_field or self.queryelem.ordering:
+            for items in super(RedisQuery, self).iterator(batch_size):
+                yield items
+        elif self.execute_query():
+            client = self.backend.client
+            options = {'expire': self.expire if self.temporary else 0}
+            ordering = self.meta.ordering
+            if ordering:
+                options['ordering'] = 'DESC' if ordering.desc else 'ASC'
+                start = 0
+                while True:
+                    options.update({'start': start,
+                                    'stop': start + batch_size - 1})
+                    items = self._load(client, dict(options))
+                    if items:
+                        yield items
+                    if len(items) < batch_size:
+                        break
+                    start += batch_size
+            else:
+                # SSCAN may return an element more than once
+                seen = set()
+                options.update({'cursor': '0', 'batch': batch_size})
+                while True:
+                    cursor, items = self._load(client, dict(options))
+                    items = [o for o in items if o.pkvalue() not in seen]
+                    seen.update((o.pkvalue() for o in items))
+                    for start in range(0, len(items), batch_size):
+                        yield items[start:start+batch_size]
+                    if cursor == '0':
+                        break
+                    options['cursor'] = cursor
+        
+    def _set_card(self):
         pipe = self.pipe
         if not self.card:
             if self.meta.ordering:
@@ -268,6 +507,134 @@ elements in the query.'''
                 self._check_member = self.sism
         else:
             self.ismember = None
+            
+    def _lookup_args(self, queryelem, keys):
+        # Arguments of the query script for the lookups in queryelem. The
+        # keys of nested queries are appended to keys.
+        args = []
+        for child in queryelem:
+            if getattr(child, 'backend', None) == self.backend:
+                lookup, value = 'set', child
+            else:
+                lookup, value = child
+            if lookup == 'set':
+                be = value.backend_query(pipe=self.pipe)
+                keys.append(be.query_key)
+                args.extend(('set', be.query_key))
+            else:
+                args.extend((lookup, '' if value is None else value))
+        return args
+    
+    def _build_intersect(self, keys):
+        # Field lookups are evaluated by the intersect script in order of
+        # increasing cardinality. Other queries are evaluated beforehand.
+        backend, meta, pipe = self.backend, self.meta, self.pipe
+        setkeys, specs = [], []
+        for child in self.queryelem:
+            if self._is_lookup(child):
+                queries = self._lookup_args(child, keys)
+                specs.append({'field': child.name,
+                              'queries': [to_string(v) for v in queries]})
+            else:
+                be = child.backend_query(pipe=pipe)
+                keys.append(be.query_key)
+                setkeys.append(be.query_key)
+                # position in the script KEYS, the first is the result
+                specs.append({'key': len(keys) + 1})
+        if setkeys:
+            pipe.script_call('move2set', setkeys,
+                             'z' if meta.ordering else 's',
+                             scripts_dependency=ODM_SCRIPTS)
+        specs = self._compound_specs(specs)
+        key = backend.tempkey(meta)
+        keys.insert(0, key)
+        backend.odmrun(pipe, 'intersect', meta, keys, self.meta_info,
+                       json.dumps(specs))
+        return key
+    
+    def _compound_specs(self, specs):
+        # Replace lookups on a single value of each field of a compound
+        # index with the index. The lookups are kept so that the script can
+        # use them if the index is not complete.
+        meta = self.meta
+        values = dict(((spec['field'], spec) for spec in specs\
+                       if len(spec.get('queries', ())) == 2 and\
+                          spec['queries'][0] == 'value'))
+        indices = [[meta.dfields[name].attname for name in names]\
+                   for names in meta.indexes]
+        for index in sorted(indices, key=len, reverse=True):
+            if all((field in values for field in index)):
+                lookups = [values.pop(field) for field in index]
+                for spec in lookups:
+                    specs.remove(spec)
+                specs.append({'index': index,
+                              'values': [spec['queries'][1] for spec in lookups],
+                              'lookups': lookups})
+        return specs
+    
+    def _materialized_key(self):
+        # The key of the materialized query and a flag indicating if it is
+        # available. The key depends on the query tree and on the generations
+        # of the models in the tree, which are increased by each commit.
+        backend, metas = self.backend, []
+        tree = json.dumps(self._query_tree(self.queryelem, metas))
+        basekey = backend.basekey(self.meta, MAT,
+                                  sha1(tree.encode('utf-8')).hexdigest())
+        keys = [basekey]
+        keys.extend((backend.basekey(meta, GEN) for meta in metas))
+        result = backend.odmrun(backend.client, 'materialized', self.meta,
+                                keys, self.meta_info)
+        return on_result(result, self._materialized_result, basekey)
+    
+    def _materialized_result(self, result, basekey):
+        gens, ttl = result
+        # reuse the key only if it does not expire before being loaded
+        return '%s:%s' % (basekey, gens), ttl > 1
+    
+    def _when_built(self, callback, *args):
+        # Call callback once the query is built, after the materialized key
+        # has been checked with an asynchronous connection.
+        if self._building is None:
+            return callback(*args)
+        else:
+            return self._building.add_callback(lambda r: callback(*args))
+    
+    def _query_tree(self, queryelem, metas):
+        # Canonical representation of queryelem. The order of lookups and
+        # of intersected or united queries does not matter.
+        if queryelem.meta not in metas:
+            metas.append(queryelem.meta)
+        children = []
+        for child in queryelem:
+            if getattr(child, 'backend', None) == self.backend:
+                children.append(self._query_tree(child, metas))
+            else:
+                lookup, value = child
+                if lookup == 'set':
+                    value = self._query_tree(value, metas)
+                else:
+                    value = '' if value is None else to_string(value)
+                children.append((lookup, value))
+        if queryelem.keyword == 'diff':
+            children = children[:1] + sorted(children[1:], key=json.dumps)
+        else:
+            children = sorted(children, key=json.dumps)
+        return (self.backend.basekey(queryelem.meta), queryelem.keyword,
+                queryelem.name, queryelem._get_field,
+                queryelem.data.get('where'), children)
+    
+    def _is_lookup(self, queryelem):
+        # True if queryelem is a plain lookup on a field of this model
+        return queryelem.keyword == 'set' and queryelem.meta is self.meta\
+                and len(queryelem) and not queryelem._get_field\
+                and not queryelem.data.get('where')
+    
+    def _execute_query(self):
+        '''Execute the query without fetching data. Returns the number of
+elements in the query.'''
+        if self._building is not None:
+            return self._when_built(self._execute_query)
+        self._set_card()
         self.card(self.query_key, script_dependency=ODM_SCRIPTS)
         self.pipe.add_callback(lambda processed, result :
                                     query_result(self.query_key, result))
@@ -281,8 +648,175 @@ elements in the query.'''
                 raise res
         return res.count
     
-    def order(self, last):
+    def _pipeline(self):
+        '''The pipeline for a script call on this query. Once the query has
+been executed a single script runs in a new non-transactional pipeline.'''
+        if self.executed:
+            return self.backend.client.pipeline(transaction=False)
+        else:
+            return self.pipe
+        
+    def update(self, fields):
+        '''Update *fields* with one ``update`` script call. If the query
+has not been executed yet, the script is added to the pipeline which
+builds the query.'''
+        if self._building is not None:
+            return self._when_built(self.update, fields)
+        if self.queryelem._get_field:
+            raise QuerySetError('Cannot update a queryset in conjunction '
+                                'with get_field.')
+        meta = self.meta
+        values, removed, score = [], [], ''
+        for field, value in iteritems(fields):
+            svalue = field.serialize(value)
+            if svalue is None:
+                removed.append(field.attname)
+            else:
+                values.extend((field.attname, svalue))
+            # the score in the id set changes with the ordering field
+            if meta.ordering and not meta.ordering.auto and\
+                    field is meta.ordering.field:
+                score = MIN_FLOAT if value is None else field.scorefun(value)
+        pipe = self._pipeline()
+        self.backend.odmrun(pipe, 'update', meta, (self.query_key,),
+                            self.meta_info, score, len(values)//2,
+                            *(values + removed))
+        self.commands, result = redis_execution(pipe, updated_query)
+        return on_result(result, self._update_result)
+    
+    def _update_result(self, result):
+        for res in result:
+            if isinstance(res, Exception):
+                raise res
+        if res.errors:
+            raise CommitException('{0} instances could not be updated. {1}'\
+                                  .format(len(res.errors), res.errors[0]))
+        return res.count
+    
+    def increment(self, field, by):
+        '''Increment *field* by *by* with one ``increment`` script call
+which uses ``HINCRBY`` for integer fields and ``HINCRBYFLOAT`` for
+float fields.'''
+        if self._building is not None:
+            return self._when_built(self.increment, field, by)
+        if self.queryelem._get_field:
+            raise QuerySetError('Cannot increment a queryset in conjunction '
+                                'with get_field.')
+        meta = self.meta
+        integer = field.python_type is int
+        ordering = meta.ordering is not None and not meta.ordering.auto and\
+                    field is meta.ordering.field
+        pipe = self._pipeline()
+        self.backend.odmrun(pipe, 'increment', meta, (self.query_key,),
+                            self.meta_info, field.attname, by,
+                            int(integer), int(ordering))
+        self.commands, result = redis_execution(pipe, incremented_query)
+        return on_result(result, self._increment_result, field)
+    
+    def _increment_result(self, result, field):
+        for res in result:
+            if isinstance(res, Exception):
+                raise res
+        if res.errors:
+            raise CommitException('{0} instances could not be incremented. '
+                                  '{1}'.format(len(res.errors), res.errors[0]))
+        tpy = self.meta.pk_to_python
+        return dict(((tpy(id), field.to_python(value))\
+                     for id, value in res.values))
+    
+    def summarize(self, fields, group_by=None):
+        '''Aggregate *fields* with one ``summarize`` script call which reads
+the instances hashes on the server.'''
+        if self._building is not None:
+            return self._when_built(self.summarize, fields, group_by)
+        if self.queryelem._get_field:
+            raise QuerySetError('Cannot summarize a queryset in conjunction '
+                                'with get_field.')
+        group = group_by.attname if group_by is not None else ''
+        pipe = self._pipeline()
+        self.backend.odmrun(pipe, 'summarize', self.meta, (self.query_key,),
+                            self.meta_info, group,
+                            *[field.attname for field in fields])
+        self.commands, result = redis_execution(pipe, summarized_query)
+        return on_result(result, self._summarize_result)
+    
+    def _summarize_result(self, result):
+        for res in result:
+            if isinstance(res, Exception):
+                raise res
+        return res.groups
+    
+    def facets(self, fields, top=None):
+        '''Count the elements for each value of *fields* with one ``facets``
+script call which intersects the query with the index sets of the fields.'''
+        if self._building is not None:
+            return self._when_built(self.facets, fields, top)
+        if self.queryelem._get_field:
+            raise QuerySetError('Cannot facet a queryset in conjunction '
+                                'with get_field.')
+        pipe = self._pipeline()
+        self.backend.odmrun(pipe, 'facets', self.meta, (self.query_key,),
+                            self.meta_info, top or 0,
+                            *[field.attname for field in fields])
+        self.commands, result = redis_execution(pipe, faceted_query)
+        return on_result(result, self._facets_result)
+    
+    def _facets_result(self, result):
+        for res in result:
+            if isinstance(res, Exception):
+                raise res
+        return res.counts
+    
+    def explain(self):
+        '''Execution plan of the query, including the ``load`` script which
+fetches its data. The plan runs in an instrumented pipeline which records the
+server time of each command and the size of the key it stores.'''
+        if self._building is not None:
+            return self._when_built(self.explain)
+        meta = self.meta
+        if not self.queryelem._get_field:
+            options = {'start': 0, 'stop': -1, 'count': True}
+            if self.queryelem.ordering:
+                options.update({'ordering': 'explicit', 'stop': None,
+                                'order': self.order(self.queryelem.ordering)})
+            elif meta.ordering:
+                options['ordering'] = 'DESC' if meta.ordering.desc else 'ASC'
+            self._load(self.pipe, options)
+        commands = self.pipe.command_stack[1:]
+        self.pipe.reset()
+        pipe = self.backend.client.pipeline(transaction=False)
+        for command in commands:
+            key = command_info(command)[1]
+            pipe.execute_command('TIME')
+            pipe.command_stack.append(command)
+            pipe.execute_command('TIME')
+            # the key is already prefixed, pass it as an argument
+            pipe.script_call('keysize', (), key or '')
+        return on_result(pipe.execute(load_script=True), self._explain_result,
+                         commands)
+    
+    def _explain_result(self, results, commands):
+        steps = []
+        for n, command in enumerate(commands):
+            start, result, end, size = results[4*n:4*n+4]
+            for res in (result, size):
+                if isinstance(res, Exception):
+                    raise res
+            name, key, args = command_info(command)
+            steps.append(query_step(name, key, args, size,
+                                    server_time(start, end)))
+        return steps
+    
+    def _loaded_query_result(self, result):
+        for res in result:
+            if isinstance(res, Exception):
+                raise res
+        self._got_count(res.count)
+        return res.items
+    
+    def order(self, ordering):
         '''Perform ordering with respect model fields.'''
+        last = ordering
         desc = last.desc
         field = last.name
         nested = last.nested
@@ -295,10 +829,52 @@ elements in the query.'''
         method = 'ALPHA' if last.field.internal_type == 'text' else ''
         if field == last.model._meta.pkname():
             field = ''
-        return {'field': field,
-                'method': method,
-                'desc': desc,
-                'nested': nested_args}
+        order = {'field': field,
+                 'method': method,
+                 'desc': desc,
+                 'nested': nested_args}
+        meta = self.meta
+        index = meta.sort_index(ordering)
+        if index:
+            order.update({'index': self.backend.basekey(meta, SRT, index),
+                          'alpha': bool(method)})
+        return order
+    
+    def seek(self, direction, value, id):
+        '''The ``order`` options of a query paginated with
+:meth:`stdnet.odm.Query.after` or :meth:`stdnet.odm.Query.before`. The
+sorted set walked is the sort index of the query ordering or the id set of a
+model sorted by its :attr:`stdnet.odm.Metaclass.ordering`.'''
+        meta = self.meta
+        ordering = self.queryelem.ordering or meta.ordering
+        index = meta.sort_index(ordering) if ordering else None
+        if index:
+            index = self.backend.basekey(meta, SRT, index)
+        elif meta.ordering and not ordering.nested and\
+                ordering.name == meta.ordering.name:
+            index = self.backend.basekey(meta, 'id')
+        else:
+            raise QuerySetError('Cannot use "%s" in a query which is not '
+                                'sorted by the model ordering or by a sort '
+                                'index.' % direction)
+        last = ordering
+        while last.nested:
+            last = last.nested
+        field = last.field
+        alpha = field.internal_type == 'text'
+        if alpha:
+            value = to_string(field.serialize(value))
+        else:
+            if not ordering.auto and last.name == field.attname:
+                value = field.scorefun(value)
+            # a string so that the score is not rounded by lua
+            value = '%.17g' % float(value)
+        return {'index': index,
+                'alpha': alpha,
+                'desc': ordering.desc,
+                'before': direction == 'before',
+                'value': value,
+                'id': '' if id is None else to_string(id)}
             
     def _has(self, val):
         r = self.ismember(self.query_key, val)
@@ -316,12 +892,22 @@ elements in the query.'''
     def _items(self, slic):
         # Unwind the database query by creating a list of arguments for
         # the load_query lua script
-        backend = self.backend
         meta = self.meta
         name = ''
         order = ()
         start, stop = self.get_redis_slice(slic)
-        if self.queryelem.ordering:
+        # if not executed, the count is evaluated by the load script
+        count = not self.executed
+        seek = self.queryelem.data.get('seek')
+        if seek:
+            # keyset pagination, start and stop are relative to the bound
+            if start < 0 or (stop is not None and stop < 0):
+                raise QuerySetError('Cannot use negative indices in a '
+                                    'query with "%s".' % seek[0])
+            name = 'seek'
+            order = self.seek(*seek)
+            stop = -1 if stop is None else max(stop - start, 0)
+        elif self.queryelem.ordering:
             order = self.order(self.queryelem.ordering)
         elif meta.ordering:
             name = 'DESC' if meta.ordering.desc else 'ASC'
@@ -329,26 +915,44 @@ elements in the query.'''
             order = self.order(meta.get_sorting(meta.pkname()))
         # Wen using the sort algorithm redis requires the number of element
         # not the stop index
-        if order:
+        if order and not seek:
             name = 'explicit'
-            N = self.execute_query()
-            if stop is None:
-                stop = N
-            elif stop < 0:
-                stop += N
-            if start < 0:
-                start += N
-            stop -= start
+            if not count:
+                N = self.execute_query()
+                if stop is None:
+                    stop = N
+                elif stop < 0:
+                    stop += N
+                if start < 0:
+                    start += N
+                stop -= start
         elif stop is None:
             stop = -1
+        if slic and self.queryelem._get_field:
+            raise QuerySetError('Cannot slice a queryset in conjunction '
+                                'with get_field. Use load_only instead.')
+        options = {'ordering': name,
+                   'order': order,
+                   'start': start,
+                   'stop': stop,
+                   'count': count}
+        if count:
+            # build, count and load in one pipeline and one script call
+            self._set_card()
+            self._load(self.pipe, options)
+            self.commands, result = redis_execution(self.pipe, loaded_query)
+            return on_result(result, self._loaded_query_result)
+        else:
+            return self._load(self.backend.client, options)
+        
+    def _load(self, client, options):
+        '''Run the ``load`` script with *options* using *client*.'''
+        meta = self.meta
         get = self.queryelem._get_field
         fields_attributes = None
         pkname_tuple = (meta.pk.name,)
         # if the get_field is available, we only load that field
         if get:
-            if slic:
-                raise QuerySetError('Cannot slice a queryset in conjunction '
-                                    'with get_field. Use load_only instead.')
             if get == meta.pk.name:
                 fields_attributes = fields = pkname_tuple
             else:
@@ -363,18 +967,14 @@ elements in the query.'''
                 fields, fields_attributes = meta.backend_fields(fields)
             else:
                 fields_attributes = ()
-        options = {'ordering': name,
-                   'order': order,
-                   'start': start,
-                   'stop': stop,
-                   'fields': fields_attributes,
-                   'related': dict(self.related_lua_args()),
-                   'get': get}
+        options.update({'fields': fields_attributes,
+                        'related': dict(self.related_lua_args()),
+                        'get': get})
         joptions = json.dumps(options)
         options.update({'fields': fields,
                         'fields_attributes': fields_attributes})
-        return backend.odmrun(backend.client, 'load', meta, (self.query_key,),
-                              self.meta_info, joptions, **options) 
+        return self.backend.odmrun(client, 'load', meta, (self.query_key,),
+                                   self.meta_info, joptions, **options)
 
     def related_lua_args(self):
         '''Generator of load_related arguments'''
@@ -732,6 +1332,11 @@ class numberarray_pushback(redis.RedisScript):
 for _,v in ipairs(ARGV) do
     a:push_back(v,true)
 end''')
+    
+
+class keysize(redis.RedisScript):
+    script = (redis.read_lua_file('commands.utils'),
+              'return redis_len(ARGV[1])')
 
 
 ################################################################################
@@ -781,7 +1386,9 @@ class BackendDataServer(stdnet.BackendDataServer):
             address = address[0]
         if 'db' not in self.params:
             self.params['db'] = 0
-        rpy = redis.Redis(address=address, **self.params)
+        params = self.params.copy()
+        self.max_commit_batch = int(params.pop('max_commit_batch', 0)) or None
+        rpy = redis.Redis(address=address, **params)
         if self.namespace:
             self.params['namespace'] = self.namespace
         return rpy
@@ -802,7 +1409,7 @@ class BackendDataServer(stdnet.BackendDataServer):
     def load_scripts(self, *names):
         if not names:
             names = redis.registered_scripts()
-        pipe = self.client.pipeline()
+        pipe = self.client.pipeline(transaction=False)
         for name in names:
             script = redis.get_script(name)
             if script:
@@ -813,8 +1420,40 @@ class BackendDataServer(stdnet.BackendDataServer):
         '''Extract model metadata for lua script stdnet/lib/lua/odm.lua'''
         data = meta.as_dict()
         data['namespace'] = self.basekey(meta)
+        data['sorts'] = [self._sort_index(meta, name)
+                         for name in meta.sort_indexes]
+        data['sort_dependents'] = list(self._sort_dependents(meta))
         return data
     
+    def _sort_index(self, meta, name):
+        # Sort index information for lua
+        ordering = meta.get_sorting(name, ImproperlyConfigured)
+        last, nested = ordering, []
+        if ordering.nested:
+            last = ordering.nested
+            nested = [self.basekey(last.model._meta), last.name]
+        return {'key': self.basekey(meta, SRT, name),
+                'field': ordering.name,
+                'alpha': last.field.internal_type == 'text',
+                'nested': nested}
+        
+    def _sort_dependents(self, meta):
+        # Sort indexes of models related to meta by a foreign key which
+        # sort by a field of meta
+        for manager in meta.related.values():
+            field = getattr(manager, 'field', None)
+            if field is None or field.type != 'related object':
+                continue
+            rmeta = field.model._meta
+            for name in rmeta.sort_indexes:
+                ordering = rmeta.get_sorting(name, ImproperlyConfigured)
+                if ordering.nested and ordering.field is field:
+                    index = self._sort_index(rmeta, name)
+                    yield {'key': index['key'],
+                           'alpha': index['alpha'],
+                           'field': index['nested'][1],
+                           'index': self.basekey(rmeta, 'idx', field.attname)}
+    
     def odmrun(self, client, script, meta, keys, meta_info, *args, **options):
         options.update({'backend': self,
                         'meta': meta,
@@ -831,8 +1470,14 @@ class BackendDataServer(stdnet.BackendDataServer):
         return redis.RedisScriptBase(where).eval(client, keys, *args)
         
     def execute_session(self, session, callback):
-        '''Execute a session in redis.'''
-        pipe = self.client.pipeline()
+        '''Execute a session in redis. When the session transaction or this
+backend have a ``max_commit_batch`` the instances of a model are committed
+in batches, one script call each, and the pipeline is atomic only if the
+transaction is.'''
+        transaction = session.transaction
+        batch = transaction.max_commit_batch or self.max_commit_batch
+        pipe = self.client.pipeline(transaction=transaction.atomic or\
+                                                not batch)
         for sm in session:  #loop through model sessions
             meta = sm.meta
             model_type = meta.model._model_type
@@ -843,40 +1488,152 @@ class BackendDataServer(stdnet.BackendDataServer):
                 delquery = sm.get_delete_query(pipe=pipe)
                 self.accumulate_delete(pipe, delquery)
                 dirty = tuple(sm.iterdirty())
-                N = len(dirty)
-                if N:
-                    lua_data = [N]
+                size = batch or max(len(dirty), 1)
+                for start in range(0, len(dirty), size):
+                    instances = dirty[start:start+size]
+                    lua_data = [len(instances)]
                     processed = []
-                    for instance in dirty:
+                    for instance in instances:
                         state = instance.state()
                         if not instance.is_valid():
                             raise FieldValueError(
                                         json.dumps(instance._dbdata['errors']))
-                        score = MIN_FLOAT
-                        if meta.ordering:
-                            if meta.ordering.auto:
-                                score = meta.ordering.name.incrby 
-                            else:
-                                v = getattr(instance, meta.ordering.name, None)
-                                if v is not None:
-                                    score = meta.ordering.field.scorefun(v)
+                        score = self.instance_score(meta, instance)
                         data = instance._dbdata['cleaned_data']
+                        changes = None
                         if state.persistent:
+                            changes = self._changes(meta, instance, data)
                             action = 'override' if instance.has_all_data else\
                                      'change'
                             id = state.iid
                         else:
                             action = 'add'
                             id = instance.pkvalue() or ''
-                        data = flat_mapping(data)
+                        if changes is None:
+                            data = flat_mapping(data)
+                        else:
+                            # send changed fields only
+                            action = 'update'
+                            values, removed = changes
+                            data = [len(values)//2] + values + removed
+                            if not meta.ordering or meta.ordering.name not in\
+                                    chain(values[::2], removed):
+                                score = ''
                         lua_data.extend((action, id, score, len(data)))
                         lua_data.extend(data)
                         processed.append(state.iid)
                     self.odmrun(pipe, 'commit', meta, (), meta_info,
                                 *lua_data, iids=processed)
         command, result = redis_execution(pipe, session_result)
+        result = on_result(result, merge_session_results)
         return on_result(result, callback, command)
     
+    def _changes(self, meta, instance, data):
+        # The fields of a persistent instance changed since it was loaded or
+        # committed, as a flat list of field-value pairs and a list of
+        # removed fields. None if the whole instance must be committed,
+        # which is also the case when nothing changed so that saving an
+        # instance again rebuilds all its indices.
+        loaded = instance._dbdata.get('loaded')
+        if loaded is None or meta.pk.type == 'composite' or\
+                (meta.ordering and meta.ordering.auto):
+            return
+        values = []
+        for name, value in iteritems(data):
+            lvalue = loaded.get(name)
+            if lvalue is None or to_bytes(value) != to_bytes(lvalue):
+                values.extend((name, value))
+        removed = [name for name, value in iteritems(loaded)\
+                   if value is not None and name not in data]
+        if values or removed:
+            return values, removed
+    
+    def bulk_create(self, meta, instances):
+        '''Add a list of new and validated *instances* of model *meta* with
+one ``commit`` script call. Return the list of ids of the new instances.'''
+        lua_data = [len(instances)]
+        for instance in instances:
+            data = flat_mapping(instance._dbdata['cleaned_data'])
+            lua_data.extend(('add', instance.pkvalue() or '',
+                             self.instance_score(meta, instance), len(data)))
+            lua_data.extend(data)
+        result = self.odmrun(self.client, 'commit', meta, (),
+                             json.dumps(self.meta(meta)), *lua_data,
+                             iids=range(len(instances)))
+        return on_result(result, self._bulk_create_result)
+    
+    def get_many(self, meta, ids, fields=None, field=None):
+        '''Load instances of model *meta* from a list of *ids* with one
+``get`` script call. Missing instances are ``None`` in the returned list.
+Values of a unique *field* are mapped to ids with the field hash map.'''
+        pkname_tuple = (meta.pk.name,)
+        fields = unique_tuple(fields or ())
+        if fields == pkname_tuple:
+            fields_attributes = fields
+        elif fields:
+            fields, fields_attributes = meta.backend_fields(fields)
+        else:
+            fields_attributes = ()
+        options = {'fields': fields_attributes}
+        if field:
+            options['field'] = field
+        joptions = json.dumps(options)
+        return self.odmrun(self.client, 'get', meta, (),
+                           json.dumps(self.meta(meta)), joptions, *ids,
+                           fields=fields, fields_attributes=fields_attributes,
+                           size=len(ids))
+    
+    def get_or_create(self, meta, instance, lookups):
+        '''Get the instance of model *meta* matching *lookups* or add the
+new and validated *instance* with one ``get_or_create`` script call.'''
+        data = flat_mapping(instance._dbdata['cleaned_data'])
+        args = list(chain(*lookups))
+        args.extend((instance.pkvalue() or '',
+                     self.instance_score(meta, instance), len(data)))
+        args.extend(data)
+        result = self.odmrun(self.client, 'get_or_create', meta, (),
+                             json.dumps(self.meta(meta)), len(lookups), *args)
+        return on_result(result, self._get_or_create_result, instance)
+    
+    def _get_or_create_result(self, result, instance):
+        if isinstance(result, Exception):
+            raise result
+        if isinstance(result.result, Exception):
+            raise result.result
+        if result.created:
+            meta = instance._meta
+            setattr(instance, meta.pkname(), meta.pk_to_python(result.result))
+            return instance, True
+        else:
+            return result.result, False
+    
+    def _bulk_create_result(self, result):
+        if isinstance(result, Exception):
+            raise result
+        ids, errors = [], []
+        for r in result.results:
+            if isinstance(r, Exception):
+                errors.append(r)
+            else:
+                ids.append(result.meta.pk_to_python(r.id))
+        if errors:
+            raise CommitException('{0} instances could not be created. {1}'\
+                                  .format(len(errors), errors[0]),
+                                  failures=len(errors))
+        return ids
+    
+    def instance_score(self, meta, instance):
+        '''The score of *instance* in the id set of model *meta*.'''
+        score = MIN_FLOAT
+        if meta.ordering:
+            if meta.ordering.auto:
+                score = meta.ordering.name.incrby 
+            else:
+                v = getattr(instance, meta.ordering.name, None)
+                if v is not None:
+                    score = meta.ordering.field.scorefun(v)
+        return score
+    
     def accumulate_delete(self, pipe, backend_query):
         # Accumulate models queries for a delete. It loops through the
         # related models to build related queries.
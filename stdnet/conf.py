@@ -22,6 +22,15 @@ overriding them.
     is contained in the :ref:`redis parser <redis-parser>` documentation.
     
     Default ``False``.
+    
+    
+.. attribute:: settings.REDIS_RAW_RESPONSE
+
+    If ``True`` redis requests keep the raw data received from the server in
+    their ``raw_response`` attribute. Useful for debugging only, since large
+    responses are held twice in memory.
+    
+    Default ``False``.
 
 
 .. attribute:: settings.MAX_CONNECTIONS
@@ -53,6 +62,7 @@ class Settings(object):
         self.DEFAULT_BACKEND = 'redis://127.0.0.1:6379?db=7'
         self.CHARSET = 'utf-8'
         self.REDIS_PY_PARSER = False
+        self.REDIS_RAW_RESPONSE = False
         self.MAX_CONNECTIONS = 2**31
         self.RedisConnectionClass = None
         
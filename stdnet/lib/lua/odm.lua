@@ -15,8 +15,19 @@ local odm = {
         multi_fields = {},
         sorted = false,
         autoincr = false,
-        indices = {}
+        indices = {},
+        ranges = {},
+        prefixes = {},
+        sorts = {},
+        sort_dependents = {},
+        compound_indices = {}
     },
+    -- range lookups which can be resolved by a sorted range index
+    score_selectors = {ge = true, gt = true, le = true, lt = true},
+    -- range lookups which can be resolved by a lexicographic index
+    lex_selectors = {startswith = true, endswith = true},
+    -- separator between value and id in lexicographic index members
+    LEX_SEPARATOR = '\0',
     range_selectors = {
         ge = function (v, v1)
             return v+0 >= v1+0
@@ -33,7 +44,7 @@ local odm = {
         startswith = function (v, v1)
             return string.sub(v, 1, string.len(v1)) == v1
         end,
-        endswidth = function (v, v1)
+        endswith = function (v, v1)
             return string.sub(v, string.len(v) - string.len(v1) + 1) == v1
         end,
         contains = function (v, v1)
@@ -50,6 +61,16 @@ odm.Model = {
         self.meta = tabletools.json_clean(meta)
         self.idset = self.meta.namespace .. ':id'    -- key for set containing all ids
         self.auto_ids = self.meta.namespace .. ':ids' -- key for auto ids
+        -- key for the generation of the model data, increased by commits
+        self.generation = self.meta.namespace .. ':gen'
+        self.range_fields = {}   -- fields with a sorted range index
+        for _, field in ipairs(self.meta.ranges or {}) do
+            self.range_fields[field] = true
+        end
+        self.prefix_fields = {}  -- fields with a lexicographic index
+        for _, field in ipairs(self.meta.prefixes or {}) do
+            self.prefix_fields[field] = true
+        end
         return self
     end,
     --[[
@@ -58,6 +79,8 @@ odm.Model = {
         args: table containing instances data to save. The data is an array
             containing arrays of the form:
                 {action, id, score, N, d_1, ..., d_N] 
+            For the update action, d_1 is the number of changed field-value
+            pairs, which are followed by the names of the removed fields.
         @return an array of id saved to the database
     --]]
     commit = function (self, num, args)
@@ -70,8 +93,33 @@ odm.Model = {
             p = idx0 + length_data
             results[count] = self:_commit_instance(action, id, score, data)
         end
+        if count > 0 then
+            odm.redis.call('incr', self.generation)
+        end
         return results
     end,
+    --[[
+        Get the instance matching lookups or, if there is none, add a new
+        instance in the same call.
+        :param lookups: array of field-value pairs of the id, unique fields
+            or indexed fields
+        :param args: id, score and data of the new instance as in commit
+        :return: {1, result} where result is the commit result of the new
+            instance, or {0, ids, data} where data is the hash of the first
+            of the matched ids.
+    --]]
+    get_or_create = function (self, lookups, args)
+        local ids = self:_lookup_ids(lookups)
+        if # ids > 0 then
+            return {0, ids, odm.redis.call('hgetall', self:object_key(ids[1]))}
+        end
+        local data = tabletools.slice(args, 4, 3 + args[3])
+        local result = self:_commit_instance('add', args[1], args[2], data)
+        if result[2] == 1 then
+            odm.redis.call('incr', self.generation)
+        end
+        return {1, result}
+    end,
     --[[
         Build a new query and store the resulting ids into destkey.
         It returns the size of the set in destkey.
@@ -80,7 +128,7 @@ odm.Model = {
         :param queries: an array containing pairs of query_type, value where query_type
             can be one of 'set', 'value' or a range filter.
     --]]
-    query = function (self, destkey, field, queries)
+    query = function (self, destkey, field, queries, fromkey)
         local ranges, unique, qtype, oper = {}, self.meta.indices[field]
         for i, value in ipairs(queries) do
             if 2*math.floor(i/2) == i then
@@ -94,7 +142,8 @@ odm.Model = {
                     -- Range queries are processed together
                     local selector = odm.range_selectors[qtype]
                     if selector then
-                        table.insert(ranges, {selector=selector, value=value})
+                        table.insert(ranges, {selector=selector, value=value,
+                                              type=qtype})
                     else
                         error('Cannot understand query type "' .. qtype .. '".')
                     end
@@ -104,14 +153,171 @@ odm.Model = {
             end
         end
         if # ranges > 0 then
-            if not oper then
-                self:_selectranges(destkey, self.idset, field, ranges)
+            local scored, prefixed, scan = {}, {}, {}
+            if oper then
+                fromkey = destkey
+            else
+                fromkey = fromkey or self.idset
+            end
+            -- split ranges into the ones resolved by the range or prefix
+            -- index and the ones which require a scan of the object hashes
+            local ranged = self.range_fields[field] and self:_index_complete(
+                    self:range_key(field), self:range_key(field, true))
+            local lexed = self.prefix_fields[field] and self:_index_complete(
+                    self:lex_key(field), self:lex_missing_key(field))
+            for _, range in ipairs(ranges) do
+                if ranged and odm.score_selectors[range.type]
+                        and tonumber(range.value) then
+                    table.insert(scored, range)
+                elseif lexed and odm.lex_selectors[range.type] then
+                    table.insert(prefixed, range)
+                else
+                    table.insert(scan, range)
+                end
+            end
+            if # scored > 0 then
+                self:_selectscores(destkey, fromkey, field, scored)
+                fromkey = destkey
+            end
+            if # prefixed > 0 then
+                self:_selectprefix(destkey, fromkey, field, prefixed)
+                fromkey = destkey
+            end
+            if # scan > 0 then
+                self:_selectranges(destkey, fromkey, field, scan)
+            end
+        end
+        return self:setsize(destkey)
+    end,
+    --[[
+        Intersect queries and store the result at destkey. Each element in
+        specs is either a table {key=n}, where n is the position of an
+        evaluated query in KEYS, or a field lookup {field=name, queries=q}
+        with the same parameters as the query method.
+        Queries are evaluated in order of increasing estimated cardinality
+        and the evaluation stops as soon as the result is empty.
+    --]]
+    intersect = function (self, destkey, keys, specs)
+        local size = self:setsize(self.idset)
+        -- a compound index replaces the lookups on its fields when it
+        -- indexes all the instances of the model
+        for i, spec in ipairs(specs) do
+            if spec.index then
+                if (odm.redis.call('get', self:compound_key(spec.index)) or 0) + 0 == size then
+                    table.insert(keys, self:compound_key(spec.index, spec.values))
+                    specs[i] = {key=# keys}
+                else
+                    specs[i] = spec.lookups[1]
+                    for j = 2, # spec.lookups do
+                        table.insert(specs, spec.lookups[j])
+                    end
+                end
+            end
+        end
+        for _, spec in ipairs(specs) do
+            if spec.key then
+                spec.key = keys[spec.key]
+                spec.size = redis_len(spec.key)
+            else
+                spec.size = self:_estimate(spec.field, spec.queries)
+            end
+        end
+        table.sort(specs, function (a, b) return a.size < b.size end)
+        odm.redis.call('del', destkey)
+        for i, spec in ipairs(specs) do
+            if i > 1 and self:setsize(destkey) == 0 then
+                break
+            end
+            if spec.size == 0 then
+                odm.redis.call('del', destkey)
+                break
+            end
+            if spec.key then
+                self:_intersect_key(destkey, spec.key, i == 1)
+            elseif i == 1 then
+                self:query(destkey, spec.field, spec.queries)
+            elseif self:_only_ranges(spec.queries) then
+                -- filter the current result in place
+                self:query(destkey, spec.field, spec.queries, destkey)
             else
-                self:_selectranges(destkey, destkey, field, ranges)
+                local tmp = self:temp_key()
+                self:query(tmp, spec.field, spec.queries)
+                self:_intersect_key(destkey, tmp)
+                odm.redis.call('del', tmp)
             end
         end
         return self:setsize(destkey)
     end,
+    --[[
+        Update fields of all instances in the query stored at key without
+        loading them.
+
+        :param score: the new score of instances in the id set of a sorted
+            model, or nil if it does not change.
+        :param args: an array containing the number of fields to set, followed
+            by the field-value pairs to set and the names of fields to delete.
+        :return: an array containing the number of updated instances followed
+            by the errors for instances which could not be updated.
+    --]]
+    update = function (self, key, score, args)
+        local fields, values, removed, result, n, err = {}, {}, {}, {}, 0
+        local i = 2
+        for _ = 1, args[1] + 0 do
+            fields[args[i]] = true
+            table.insert(values, args[i])
+            table.insert(values, args[i+1])
+            i = i + 2
+        end
+        for j = i, # args do
+            fields[args[j]] = true
+            table.insert(removed, args[j])
+        end
+        for _, id in ipairs(redis_members(key)) do
+            if odm.redis.call('exists', self:object_key(id)) + 0 == 1 then
+                err = self:_update_instance(id, score, fields, values, removed)
+                if err then
+                    table.insert(result, err)
+                else
+                    n = n + 1
+                end
+            end
+        end
+        if n > 0 then
+            odm.redis.call('incr', self.generation)
+        end
+        table.insert(result, 1, n)
+        return result
+    end,
+    --[[
+        Increment a numeric field of the instances of a query.
+        :param key: the key containing the set of ids
+        :param field: the field to increment
+        :param by: the increment
+        :param integer: true for integer fields, incremented with HINCRBY
+        :param ordering: true if the field is the model ordering
+        :return: an array with the ids and new values of the incremented
+            instances followed by the error messages of the instances
+            which could not be incremented.
+    --]]
+    increment = function (self, key, field, by, integer, ordering)
+        local result, errors, value, err = {}, {}
+        for _, id in ipairs(redis_members(key)) do
+            if odm.redis.call('exists', self:object_key(id)) + 0 == 1 then
+                value, err = self:_increment_instance(id, field, by, integer,
+                                                      ordering)
+                if err then
+                    table.insert(errors, err)
+                else
+                    table.insert(result, id)
+                    table.insert(result, value)
+                end
+            end
+        end
+        if # result > 0 then
+            odm.redis.call('incr', self.generation)
+        end
+        return {result, errors}
+    end,
     --[[
         Delete a query stored in key id
     --]]
@@ -122,6 +328,7 @@ odm.Model = {
             self:_update_indices(false, id)
             local num = odm.redis.call('del', idkey) + 0
             self:remove_from_set(self.idset, id)
+            self:_update_sort_dependents(id)
             if self.meta.multi_fields then
                 for _, name in ipairs(self.meta.multi_fields) do
                     odm.redis.call('del', idkey .. ':' .. name)
@@ -131,6 +338,9 @@ odm.Model = {
                 table.insert(results, id)
             end
         end
+        if # ids > 0 then
+            odm.redis.call('incr', self.generation)
+        end
         return results
     end,
     --[[
@@ -148,41 +358,240 @@ odm.Model = {
         :param options: dictionary of options 
     --]]
     load = function (self, key, options)
-        local result, ids, related_items
+        local result, ids, related_items, size, cursor
         options = tabletools.json_clean(options)
+        if options.expire and options.expire > 0 then
+            -- keep a temporary key alive while it is loaded in batches
+            odm.redis.call('expire', key, options.expire)
+        end
+        if options.count then
+            -- The number of elements in the query is returned together with
+            -- the data so that a query is counted and loaded in one call.
+            size = self:setsize(key)
+            if options.ordering == 'explicit' then
+                options.start, options.stop = self:_explicit_slice(size,
+                    options.start, options.stop)
+            end
+        end
         if options.get and options.get ~= '' then
             return redis_members(key)
+        elseif options.ordering == 'seek' then
+            ids = self:_seek(key, options.start, options.stop, options.order)
         elseif options.ordering == 'explicit' then
             ids = self:_explicit_ordering(key, options.start, options.stop, options.order)
         elseif options.ordering == 'DESC' then
             ids = odm.redis.call('zrevrange', key, options.start, options.stop)
         elseif options.ordering == 'ASC' then
             ids = odm.redis.call('zrange', key, options.start, options.stop)
+        elseif options.cursor then
+            -- one batch of a set scan. SSCAN requires redis 2.8, older
+            -- servers return the whole set with a final cursor.
+            ids = odm.redis.pcall('sscan', key, options.cursor, 'count',
+                                  options.batch)
+            if ids.err then
+                cursor, ids = '0', odm.redis.call('smembers', key)
+            else
+                cursor, ids = ids[1], ids[2]
+            end
         else
             ids = odm.redis.call('smembers', key)
         end
         -- Now load fields
-        if options.fields and # options.fields > 0 then
-            if # options.fields == 1 and options.fields[1] == self.meta.id_name then
-                result = ids
+        result = self:_load_fields(ids, options.fields)
+        if options.related then
+            related_items = self:_load_related(result, options.related)
+        else
+            related_items = {}
+        end
+        if size then
+            return {result, related_items, size}
+        elseif cursor then
+            return {result, related_items, cursor}
+        else
+            return {result, related_items}
+        end
+    end,
+    --[[
+        Load instances from a list of ids, in the order given.
+        :param ids: the ids of the instances to load or, if options.field
+            is given, values of the unique field options.field
+        :param options: dictionary of options
+        :return: the loaded data and the zero-based positions in ids of
+            the instances which do not exist
+    --]]
+    get = function (self, ids, options)
+        local found, missing, result, data = {}, {}, {}
+        options = tabletools.json_clean(options)
+        local fields = options.fields
+        if options.field and # ids > 0 then
+            -- map the unique values into ids
+            ids = odm.redis.call('hmget', self:map_key(options.field), unpack(ids))
+        end
+        for i, id in ipairs(ids) do
+            if not id then
+                table.insert(missing, i-1)
+            elseif fields and # fields > 0 then
+                if odm.redis.call('exists', self:object_key(id)) == 1 then
+                    table.insert(found, id)
+                else
+                    table.insert(missing, i-1)
+                end
             else
-                result = {}
-                for _, id in ipairs(ids) do
-                    table.insert(result, {id, odm.redis.call('hmget', self:object_key(id), unpack(options.fields))})
+                -- the hash of an instance is never empty
+                data = odm.redis.call('hgetall', self:object_key(id))
+                if # data > 0 then
+                    table.insert(result, {id, data})
+                else
+                    table.insert(missing, i-1)
                 end
             end
-        else
-            result = {}
-            for _, id in ipairs(ids) do
-                table.insert(result, {id, odm.redis.call('hgetall', self:object_key(id))})
+        end
+        if fields and # fields > 0 then
+            result = self:_load_fields(found, fields)
+        end
+        return {result, {}, missing}
+    end,
+    --[[
+        Generations of the models of a materialized query.
+        :param basekey: the key of the query tree.
+        :param genkeys: the generation keys of the models in the query.
+        :return: the generations, separated by dots, and the time to live
+            of the key basekey:generations storing the materialized query.
+    --]]
+    materialized = function (self, basekey, genkeys)
+        local gens = {}
+        for _, key in ipairs(genkeys) do
+            table.insert(gens, odm.redis.call('get', key) or '0')
+        end
+        gens = table.concat(gens, '.')
+        return {gens, odm.redis.call('ttl', basekey .. ':' .. gens)}
+    end,
+    --
+    -- Store the query at key into matkey for expire seconds
+    materialize = function (self, key, matkey, expire)
+        if odm.redis.call('exists', key) + 0 == 1 then
+            odm.redis.call('rename', key, matkey)
+            odm.redis.call('expire', matkey, expire)
+        end
+        return self:setsize(matkey)
+    end,
+    --[[
+        Aggregate the instances in the query stored at key without loading
+        them.
+        :param group: the field to group instances by or an empty string.
+        :param fields: the numeric fields to aggregate.
+        :return: an array with an entry for each group, containing the
+            group value, the number of instances and, for each field, the
+            number of values, their sum, minimum and maximum.
+    --]]
+    summarize = function (self, key, group, fields)
+        local names, groups, result = {}, {}, {}
+        if group == '' and # fields == 0 then
+            return {{'', self:setsize(key)}}
+        end
+        for _, field in ipairs(fields) do
+            table.insert(names, field)
+        end
+        if group ~= '' then
+            table.insert(names, group)
+        end
+        for _, id in ipairs(self:setids(key)) do
+            local values = odm.redis.call('hmget', self:object_key(id), unpack(names))
+            local value = ''
+            if group ~= '' then
+                value = values[# names] or ''
+            end
+            local stats = groups[value]
+            if not stats then
+                stats = {count = 0}
+                for i = 1, # fields do
+                    stats[i] = {n = 0, sum = 0}
+                end
+                groups[value] = stats
+                table.insert(result, value)
+            end
+            stats.count = stats.count + 1
+            for i, st in ipairs(stats) do
+                local v = tonumber(values[i])
+                if v then
+                    st.n = st.n + 1
+                    st.sum = st.sum + v
+                    if not st.min or v < st.min then
+                        st.min, st.vmin = v, values[i]
+                    end
+                    if not st.max or v > st.max then
+                        st.max, st.vmax = v, values[i]
+                    end
+                end
             end
         end
-        if options.related then
-            related_items = self:_load_related(result, options.related)
-        else
-            related_items = {}
+        for i, value in ipairs(result) do
+            local stats = groups[value]
+            local row = {value, stats.count}
+            for _, st in ipairs(stats) do
+                -- numbers are returned as strings so that they are not
+                -- truncated to integers
+                table.insert(row, st.n)
+                table.insert(row, string.format('%.17g', st.sum))
+                table.insert(row, st.vmin or '')
+                table.insert(row, st.vmax or '')
+            end
+            result[i] = row
+        end
+        if group == '' and # result == 0 then
+            result = {{'', 0}}
+        end
+        return result
+    end,
+    --[[
+        Count the ids of the query stored at key for each value of indexed
+        fields, by intersecting key with the index set of each value. The
+        set of values of a field is rebuilt from the instances when it does
+        not cover all of them, as for instances saved by previous versions.
+        :param top: maximum number of values for each field, 0 for all.
+        :param fields: the indexed fields.
+        :return: an array with an entry for each field, a flat array of
+            value-count pairs sorted by decreasing count.
+    --]]
+    facets = function (self, key, top, fields)
+        local result, tmp, all = {}, self:temp_key(), key == self.idset
+        local size = self:setsize(self.idset)
+        for _, field in ipairs(fields) do
+            local counts, values, total = {}, {}, 0
+            local members = odm.redis.call('smembers', self:values_key(field))
+            for _, value in ipairs(members) do
+                total = total + self:setsize(self:index_key(field, value))
+            end
+            if total ~= size then
+                members = self:_index_values(field)
+            end
+            for _, value in ipairs(members) do
+                local idxkey, count = self:index_key(field, value)
+                if all then
+                    count = self:setsize(idxkey)
+                elseif self.meta.sorted then
+                    count = odm.redis.call('zinterstore', tmp, 2, key, idxkey)
+                else
+                    count = odm.redis.call('sinterstore', tmp, key, idxkey)
+                end
+                if count + 0 > 0 then
+                    table.insert(counts, {value, count + 0})
+                end
+            end
+            table.sort(counts, function (a, b)
+                return a[2] > b[2] or (a[2] == b[2] and a[1] < b[1])
+            end)
+            for i, value in ipairs(counts) do
+                if top > 0 and i > top then
+                    break
+                end
+                table.insert(values, value[1])
+                table.insert(values, value[2])
+            end
+            table.insert(result, values)
         end
-        return {result, related_items}
+        odm.redis.call('del', tmp)
+        return result
     end,
     --
     --          INTERNAL METHODS
@@ -203,6 +612,47 @@ odm.Model = {
         return idxkey
     end,
     --
+    -- set of ids for the values of the fields of a compound index. If
+    -- values is not given, the key of the number of ids in the index
+    compound_key = function (self, fields, values)
+        local key = self.meta.namespace .. ':cdx:' .. table.concat(fields, ',')
+        if values then
+            key = key .. ':' .. table.concat(values, odm.LEX_SEPARATOR)
+        end
+        return key
+    end,
+    --
+    -- set of the values of a non unique indexed field, the suffixes of
+    -- its index keys
+    values_key = function (self, field)
+        return self.meta.namespace .. ':idv:' .. field
+    end,
+    --
+    -- sorted set mapping ids to the numeric value of field. If missing,
+    -- the set of ids without a numeric value for field
+    range_key = function (self, field, missing)
+        if missing then
+            return self.meta.namespace .. ':rnx:' .. field
+        else
+            return self.meta.namespace .. ':rng:' .. field
+        end
+    end,
+    --
+    -- sorted set of value-id members for lexicographic lookups. If
+    -- reversed, the values are stored reversed for endswith lookups
+    lex_key = function (self, field, reversed)
+        if reversed then
+            return self.meta.namespace .. ':xel:' .. field
+        else
+            return self.meta.namespace .. ':lex:' .. field
+        end
+    end,
+    --
+    -- set of ids without a value for field, not in its lexicographic index
+    lex_missing_key = function (self, field)
+        return self.meta.namespace .. ':lxn:' .. field
+    end,
+    --
     --[[
         A temporary key in the model namespace
     --]]
@@ -322,11 +772,113 @@ odm.Model = {
         end
     end,
     --
+    -- true if the sorted set index at key and the set of ids missing from
+    -- it hold all the instances of the model. Instances committed before
+    -- the index was available are not in it until they are saved again,
+    -- and lookups scan the object hashes.
+    _index_complete = function(self, key, missing)
+        return odm.redis.call('zcard', key) +
+               odm.redis.call('scard', missing) ==
+               self:setsize(self.idset)
+    end,
+    --
+    -- Add the values of field in all the instances of the model to the set
+    -- of values of its index and return them.
+    _index_values = function(self, field)
+        local key = self:values_key(field)
+        for _, id in ipairs(redis_members(self.idset)) do
+            odm.redis.call('sadd', key, odm.redis.call('hget',
+                           self:object_key(id), field) or '')
+        end
+        return odm.redis.call('smembers', key)
+    end,
+    --
+    -- Select ids using the range index of field. The numeric ranges
+    -- are combined into one ZRANGEBYSCORE call.
+    _selectscores = function(self, destkey, fromkey, field, ranges)
+        local low, high = self:_score_bounds(ranges)
+        local ids = odm.redis.call('zrangebyscore', self:range_key(field),
+                                   low, high)
+        self:_select_ids(destkey, fromkey, field, ids)
+    end,
+    --
+    -- Select ids using the lexicographic index of field. Each range is
+    -- resolved with a ZRANGEBYLEX call on the prefix (startswith) or on
+    -- the reversed prefix (endswith).
+    _selectprefix = function(self, destkey, fromkey, field, ranges)
+        for _, range in ipairs(ranges) do
+            local key, prefix = self:lex_key(field), range.value
+            if range.type == 'endswith' then
+                key, prefix = self:lex_key(field, true), string.reverse(prefix)
+            end
+            local ids = {}
+            for _, member in ipairs(odm.redis.call('zrangebylex', key,
+                    '[' .. prefix, '[' .. prefix .. '\255')) do
+                table.insert(ids, self:_lex_id(member))
+            end
+            self:_select_ids(destkey, fromkey, field, ids)
+            fromkey = destkey
+        end
+    end,
+    --
+    -- Store ids into destkey. If fromkey is destkey the ids are intersected
+    -- with the current result, otherwise they are added to it.
+    _select_ids = function(self, destkey, fromkey, field, ids)
+        if fromkey == destkey then
+            -- intersect the current result with ids
+            local tmp = self:temp_key()
+            for _, id in ipairs(ids) do
+                odm.redis.call('sadd', tmp, id)
+            end
+            if self.meta.sorted then
+                odm.redis.call('zinterstore', destkey, 2, destkey, tmp,
+                               'weights', 1, 0)
+            else
+                odm.redis.call('sinterstore', destkey, destkey, tmp)
+            end
+            odm.redis.call('del', tmp)
+        else
+            for _, id in ipairs(ids) do
+                self:_add(destkey, field, id)
+            end
+        end
+    end,
+    --
+    -- The id in a lexicographic index member is after the last separator
+    _lex_id = function(self, member)
+        local pos = string.find(string.reverse(member), odm.LEX_SEPARATOR, 1,
+                                true)
+        return string.sub(member, string.len(member) - pos + 2)
+    end,
+    --
+    _score_bounds = function(self, ranges)
+        local low, high, lowv, highv = '-inf', '+inf'
+        for _, range in ipairs(ranges) do
+            local v = range.value + 0
+            if range.type == 'ge' or range.type == 'gt' then
+                if not lowv or v > lowv or (v == lowv and range.type == 'gt') then
+                    lowv = v
+                    low = range.value
+                    if range.type == 'gt' then
+                        low = '(' .. low
+                    end
+                end
+            elseif not highv or v < highv or (v == highv and range.type == 'lt') then
+                highv = v
+                high = range.value
+                if range.type == 'lt' then
+                    high = '(' .. high
+                end
+            end
+        end
+        return low, high
+    end,
+    --
     _selectranges = function(self, destkey, fromkey, field, ranges)
         local ordered, ids, scores, value = self.meta.sorted
         if ordered then
             ids, scores = {}, {}
-            for i, score in ipairs(self.redis.call('zrange', fromkey, 0, -1, 'withscores')) do
+            for i, score in ipairs(odm.redis.call('zrange', fromkey, 0, -1, 'withscores')) do
                 if 2*math.floor(i/2) == i then
                     table.insert(scores, score)
                 else
@@ -363,6 +915,9 @@ odm.Model = {
     --
     _commit_instance = function (self, action, id, score, data)
         -- Commit one instance and update indices
+        if action == 'update' then
+            return self:_commit_changes(id, score, data)
+        end
         local created_id, composite_id, errors = false, self.meta.id_type == COMPOSITE_ID, {}
         if self.meta.id_type == AUTO_ID then
             if id == '' then
@@ -423,13 +978,56 @@ odm.Model = {
         if # errors > 0 then
             return {id, 0, errors[1]}
         else
+            self:_update_sort_dependents(id)
             return {id, 1, score}
         end
     end,
     --
-    _update_indices = function (self, update, id, oldid, score)
+    -- Commit the changed fields of instance id. Only the indices of the
+    -- changed and removed fields are updated. score is an empty string
+    -- when the ordering of the model does not change.
+    _commit_changes = function (self, id, score, data)
+        local n, fields, values, removed, err = 2*data[1] + 1, {}, {}, {}
+        if odm.redis.call('exists', self:object_key(id)) + 0 == 0 then
+            return {id, 0, 'Instance ' .. id .. ' is not available.'}
+        end
+        for i = 2, # data do
+            if i <= n then
+                if i % 2 == 0 then
+                    fields[data[i]] = true
+                end
+                table.insert(values, data[i])
+            else
+                fields[data[i]] = true
+                table.insert(removed, data[i])
+            end
+        end
+        if score == '' then
+            score = nil
+        end
+        if next(fields) then
+            err = self:_update_instance(id, score, fields, values, removed)
+            if err then
+                return {id, 0, err}
+            end
+        end
+        if self.meta.sorted then
+            score = odm.redis.call('zscore', self.idset, id)
+        end
+        return {id, 1, score or 0}
+    end,
+    --
+    _update_indices = function (self, update, id, oldid, score, fields)
         local idkey, errors, idxkey, value = self:object_key(id), {}
-        for field, unique in pairs(self.meta.indices) do
+        local indices = self.meta.indices
+        local range_fields, prefix_fields = self.range_fields, self.prefix_fields
+        if fields then
+            -- update the indices of fields only
+            indices = self:_select_fields(indices, fields)
+            range_fields = self:_select_fields(range_fields, fields)
+            prefix_fields = self:_select_fields(prefix_fields, fields)
+        end
+        for field, unique in pairs(indices) do
             -- obtain the field value
             value = odm.redis.call('hget', idkey, field)
             if unique then
@@ -452,16 +1050,297 @@ odm.Model = {
                 idxkey = self:index_key(field, value)
                 if update then
                     self:setadd(idxkey, score, id)
+                    odm.redis.call('sadd', self:values_key(field), value or '')
                 else
                     self:remove_from_set(idxkey, id)
+                    if self:setsize(idxkey) == 0 then
+                        odm.redis.call('srem', self:values_key(field), value or '')
+                    end
+                end
+            end
+        end
+        -- compound indices
+        for _, index in ipairs(self.meta.compound_indices or {}) do
+            local selected = not fields
+            for _, field in ipairs(index) do
+                selected = selected or fields[field]
+            end
+            if selected then
+                self:_update_compound_index(index, id, score, update)
+            end
+        end
+        -- sorted range indices
+        for field, _ in pairs(range_fields) do
+            idxkey = self:range_key(field)
+            if update then
+                value = odm.redis.call('hget', idkey, field)
+                if value and tonumber(value) then
+                    odm.redis.call('zadd', idxkey, value, id)
+                    odm.redis.call('srem', self:range_key(field, true), id)
+                else
+                    odm.redis.call('zrem', idxkey, id)
+                    odm.redis.call('sadd', self:range_key(field, true), id)
+                end
+            else
+                odm.redis.call('zrem', idxkey, id)
+                odm.redis.call('srem', self:range_key(field, true), id)
+            end
+        end
+        -- sort indices
+        for _, sort in ipairs(self.meta.sorts or {}) do
+            if not fields or fields[sort.field] then
+                self:_update_sort_index(sort, id,
+                                        update and self:_sort_value(sort, id),
+                                        update)
+            end
+        end
+        -- lexicographic prefix indices
+        for field, _ in pairs(prefix_fields) do
+            value = odm.redis.call('hget', idkey, field)
+            if value then
+                local member = value .. odm.LEX_SEPARATOR .. id
+                local rmember = string.reverse(value) .. odm.LEX_SEPARATOR .. id
+                if update then
+                    odm.redis.call('zadd', self:lex_key(field), 0, member)
+                    odm.redis.call('zadd', self:lex_key(field, true), 0, rmember)
+                    odm.redis.call('srem', self:lex_missing_key(field), id)
+                else
+                    odm.redis.call('zrem', self:lex_key(field), member)
+                    odm.redis.call('zrem', self:lex_key(field, true), rmember)
                 end
+            elseif update then
+                odm.redis.call('sadd', self:lex_missing_key(field), id)
+            else
+                odm.redis.call('srem', self:lex_missing_key(field), id)
             end
         end
         return errors
     end,
     --
+    -- Estimate the number of ids matched by a query on field without
+    -- evaluating it. Range lookups which cannot be resolved by an index
+    -- are estimated with the size of the model.
+    _estimate = function (self, field, queries)
+        local unique, size, qtype, ranges = self.meta.indices[field], 0
+        local lookups = false
+        for i, value in ipairs(queries) do
+            if 2*math.floor(i/2) == i then
+                if qtype == 'set' then
+                    lookups = true
+                    size = size + redis_len(value)
+                elseif qtype == 'value' then
+                    lookups = true
+                    if unique or field == self.meta.id_name then
+                        size = size + 1
+                    else
+                        size = size + self:setsize(self:index_key(field, value))
+                    end
+                else
+                    ranges = ranges or {}
+                    table.insert(ranges, {type=qtype, value=value})
+                end
+            else
+                qtype = value
+            end
+        end
+        if not lookups then
+            size = self:setsize(self.idset)
+        end
+        if ranges and self.range_fields[field] and self:_index_complete(
+                self:range_key(field), self:range_key(field, true)) then
+            local scored = {}
+            for _, range in ipairs(ranges) do
+                if odm.score_selectors[range.type] and tonumber(range.value) then
+                    table.insert(scored, range)
+                end
+            end
+            if # scored > 0 then
+                local low, high = self:_score_bounds(scored)
+                size = math.min(size, odm.redis.call('zcount',
+                                    self:range_key(field), low, high))
+            end
+        end
+        return size
+    end,
+    --
+    -- true if queries contains range lookups only
+    _only_ranges = function (self, queries)
+        for i, value in ipairs(queries) do
+            if 2*math.floor(i/2) ~= i and (value == 'set' or value == 'value') then
+                return false
+            end
+        end
+        return true
+    end,
+    --
+    -- Intersect destkey with key. If first, key is copied into destkey.
+    _intersect_key = function (self, destkey, key, first)
+        if first then
+            if self.meta.sorted then
+                odm.redis.call('zunionstore', destkey, 1, key)
+            else
+                odm.redis.call('sunionstore', destkey, key)
+            end
+        elseif self.meta.sorted then
+            odm.redis.call('zinterstore', destkey, 2, destkey, key,
+                           'weights', 1, 0)
+        else
+            odm.redis.call('sinterstore', destkey, destkey, key)
+        end
+    end,
+    --
+    -- Add id to, or remove it from, the set of a compound index for its
+    -- current values. The number of ids in the index is kept so that
+    -- queries can tell if the index is complete.
+    _update_compound_index = function (self, fields, id, score, update)
+        local values = odm.redis.call('hmget', self:object_key(id), unpack(fields))
+        for i = 1, # fields do
+            values[i] = values[i] or ''
+        end
+        local key, n = self:compound_key(fields, values)
+        if self.meta.sorted then
+            if update then
+                n = odm.redis.call('zadd', key, score, id)
+            else
+                n = -odm.redis.call('zrem', key, id)
+            end
+        elseif update then
+            n = odm.redis.call('sadd', key, id)
+        else
+            n = -odm.redis.call('srem', key, id)
+        end
+        if n ~= 0 then
+            odm.redis.call('incrby', self:compound_key(fields), n)
+        end
+    end,
+    --
+    -- The entries of table t with a key in fields
+    _select_fields = function (self, t, fields)
+        local selected = {}
+        for field, value in pairs(t) do
+            if fields[field] then
+                selected[field] = value
+            end
+        end
+        return selected
+    end,
+    --
+    -- Update fields of instance id. values is an array of field-value
+    -- pairs to set and removed an array of fields to delete. Only indices
+    -- of fields are updated. If a unique constraint is violated, the
+    -- instance is restored and the error message returned.
+    _update_instance = function (self, id, score, fields, values, removed)
+        local idkey, names, original, oldscore, errors = self:object_key(id), {}, {}
+        for field, _ in pairs(fields) do
+            table.insert(names, field)
+        end
+        for i, value in ipairs(odm.redis.call('hmget', idkey, unpack(names))) do
+            if value then
+                table.insert(original, names[i])
+                table.insert(original, value)
+            end
+        end
+        if self.meta.sorted then
+            oldscore = odm.redis.call('zscore', self.idset, id)
+            if score then
+                odm.redis.call('zadd', self.idset, score, id)
+            else
+                score = oldscore
+            end
+        end
+        self:_update_indices(false, id, id, nil, fields)
+        if # values > 0 then
+            odm.redis.call('hmset', idkey, unpack(values))
+        end
+        if # removed > 0 then
+            odm.redis.call('hdel', idkey, unpack(removed))
+        end
+        errors = self:_update_indices(true, id, id, score, fields)
+        if # errors > 0 then
+            -- Rollback changes
+            self:_update_indices(false, id, id, nil, fields)
+            odm.redis.call('hdel', idkey, unpack(names))
+            if # original > 0 then
+                odm.redis.call('hmset', idkey, unpack(original))
+            end
+            if oldscore then
+                odm.redis.call('zadd', self.idset, oldscore, id)
+            end
+            self:_update_indices(true, id, id, oldscore, fields)
+            return errors[1]
+        end
+        self:_update_sort_dependents(id, fields)
+    end,
+    --
+    -- Increment field of instance id and update its indices. If the stored
+    -- value is not a number or a unique constraint is violated, the instance
+    -- is left unchanged and the error message returned as second value.
+    _increment_instance = function (self, id, field, by, integer, ordering)
+        local idkey, fields, value, score, oldscore = self:object_key(id), {[field]=true}
+        local original = odm.redis.call('hget', idkey, field)
+        -- Validate before removing indices, a failing HINCRBY would leave
+        -- the instance out of them since scripts don't roll back.
+        if original and not (tonumber(original) and
+                (not integer or string.match(original, '^%-?%d+$'))) then
+            return nil, 'Field "' .. field .. '" of "' .. id .. '" is not a number: "' .. original .. '".'
+        end
+        self:_update_indices(false, id, id, nil, fields)
+        if integer then
+            value = odm.redis.call('hincrby', idkey, field, by)
+        else
+            value = odm.redis.call('hincrbyfloat', idkey, field, by)
+        end
+        if self.meta.sorted then
+            oldscore = odm.redis.call('zscore', self.idset, id)
+            score = oldscore
+            if ordering then
+                score = value
+                odm.redis.call('zadd', self.idset, score, id)
+            end
+        end
+        local errors = self:_update_indices(true, id, id, score, fields)
+        if # errors > 0 then
+            -- Rollback changes
+            self:_update_indices(false, id, id, nil, fields)
+            if original then
+                odm.redis.call('hset', idkey, field, original)
+            else
+                odm.redis.call('hdel', idkey, field)
+            end
+            if ordering and oldscore then
+                odm.redis.call('zadd', self.idset, oldscore, id)
+            end
+            self:_update_indices(true, id, id, oldscore, fields)
+            return nil, errors[1]
+        end
+        self:_update_sort_dependents(id, fields)
+        return tostring(value)
+    end,
+    --
+    -- Convert a python slice into the LIMIT offset and count used by
+    -- the SORT command. size is the number of elements in the query.
+    _explicit_slice = function (self, size, start, stop)
+        start = start or 0
+        if not stop then
+            stop = size
+        elseif stop < 0 then
+            stop = stop + size
+        end
+        if start < 0 then
+            start = start + size
+        end
+        return start, stop - start
+    end,
+    --
     _explicit_ordering = function (self, key, start, stop, order)
         local tkeys, sortargs, bykey, ids = {}, {}
+        -- use the sort index when available
+        if order.index then
+            ids = self:_index_ordering(key, start, stop, order)
+            if ids then
+                return ids
+            end
+        end
         -- nested sorting for foreign key fields
         if order.nested and # order.nested > 0 then
             -- generate a temporary key where to store the hash table holding
@@ -503,6 +1382,315 @@ odm.Model = {
         redis_delete(tkeys)
         return ids
     end,
+    --[[
+        Order the ids in key using the sort index order.index. The index
+        is walked in order when key contains a large enough fraction of
+        the model ids, otherwise a numeric index is intersected with key.
+        Returns nil if the index cannot be used.
+    --]]
+    _index_ordering = function (self, key, start, stop, order)
+        local index, ids = order.index, {}
+        local total = odm.redis.call('zcard', index) + 0
+        -- the index is not complete, it was declared after data was added
+        if total ~= self:setsize(self.idset) then
+            return nil
+        end
+        local size = self:setsize(key)
+        local count, range = size, 'zrange'
+        if stop > 0 then
+            count = stop
+        elseif start > 0 or stop < 0 then
+            -- an empty slice, as the LIMIT of the SORT command
+            return {}
+        end
+        if order.desc then
+            range = 'zrevrange'
+        end
+        if key == self.idset then
+            ids = odm.redis.call(range, index, start, start + count - 1)
+        elseif size*size >= (start + count)*total then
+            local pos, skip, window = 0, start, math.max(count, 100)
+            while # ids < count and pos < total do
+                for _, id in ipairs(odm.redis.call(range, index, pos,
+                                                   pos + window - 1)) do
+                    if order.alpha then
+                        id = self:_lex_id(id)
+                    end
+                    if self:_ismember(key, id) then
+                        if skip > 0 then
+                            skip = skip - 1
+                        else
+                            table.insert(ids, id)
+                            if # ids == count then
+                                break
+                            end
+                        end
+                    end
+                end
+                pos = pos + window
+            end
+            return ids
+        elseif not order.alpha then
+            local tkey = self:temp_key()
+            odm.redis.call('zinterstore', tkey, 2, index, key, 'weights', 1, 0)
+            ids = odm.redis.call(range, tkey, start, start + count - 1)
+            odm.redis.call('del', tkey)
+            return ids
+        else
+            return nil
+        end
+        if order.alpha then
+            for i, member in ipairs(ids) do
+                ids[i] = self:_lex_id(member)
+            end
+        end
+        return ids
+    end,
+    --[[
+        Keyset pagination. Walk the sorted set seek.index from the bound
+        given by seek.value and seek.id, in the query order or in the
+        opposite order for before queries. Return at most count ids of
+        key, all of them if count is negative, after skipping start ids.
+    --]]
+    _seek = function (self, key, start, count, seek)
+        local index, value, id, ids, stages = seek.index, seek.value, seek.id, {}, {}
+        local reverse, skip, tkey = seek.desc, start
+        if seek.before then
+            reverse = not reverse
+        end
+        local total = odm.redis.call('zcard', index) + 0
+        if total ~= self:setsize(self.idset) then
+            error('Sort index "' .. index .. '" is not complete.')
+        end
+        local filter = key ~= index and key ~= self.idset
+        if filter and not seek.alpha then
+            local size = self:setsize(key)
+            if count < 0 or size*size < (start + count)*total then
+                -- a small query, intersect it with the index
+                tkey = self:temp_key()
+                odm.redis.call('zinterstore', tkey, 2, index, key, 'weights', 1, 0)
+                index, filter = tkey, false
+            end
+        end
+        if seek.alpha then
+            -- members are value-id pairs, the bound is exclusive
+            local command, bound, last = 'zrangebylex', value .. odm.LEX_SEPARATOR, '+'
+            if reverse then
+                command, last = 'zrevrangebylex', '-'
+            end
+            if id ~= '' then
+                bound = '(' .. bound .. id
+            elseif reverse then
+                bound = '(' .. bound
+            else
+                bound = '[' .. value .. '\1'
+            end
+            table.insert(stages, {fetch = function (offset, window)
+                return odm.redis.call(command, index, bound, last, 'limit', offset, window)
+            end})
+        else
+            local score = id ~= '' and odm.redis.call('zscore', index, id)
+            if score and tonumber(score) == tonumber(value) then
+                -- the bound is in the index, walk from its rank
+                local command, rank = 'zrange', 'zrank'
+                if reverse then
+                    command, rank = 'zrevrange', 'zrevrank'
+                end
+                rank = odm.redis.call(rank, index, id) + 1
+                table.insert(stages, {fetch = function (offset, window)
+                    return odm.redis.call(command, index, rank + offset, rank + offset + window - 1)
+                end})
+            else
+                local command, last = 'zrangebyscore', '+inf'
+                if reverse then
+                    command, last = 'zrevrangebyscore', '-inf'
+                end
+                if id ~= '' then
+                    -- ids with the same score are ordered lexicographically
+                    table.insert(stages, {fetch = function (offset, window)
+                        return odm.redis.call(command, index, value, value, 'limit', offset, window)
+                    end, keep = function (member)
+                        if reverse then
+                            return member < id
+                        else
+                            return member > id
+                        end
+                    end})
+                end
+                table.insert(stages, {fetch = function (offset, window)
+                    return odm.redis.call(command, index, '(' .. value, last, 'limit', offset, window)
+                end})
+            end
+        end
+        local window = 1000
+        if count >= 0 then
+            window = start + count
+            if filter then
+                window = math.max(window, 100)
+            end
+        end
+        for _, stage in ipairs(stages) do
+            local offset = 0
+            while window > 0 and (count < 0 or # ids < count) do
+                local members = stage.fetch(offset, window)
+                for _, member in ipairs(members) do
+                    local mid = member
+                    if seek.alpha then
+                        mid = self:_lex_id(member)
+                    end
+                    if (not stage.keep or stage.keep(member)) and
+                            (not filter or self:_ismember(key, mid)) then
+                        if skip > 0 then
+                            skip = skip - 1
+                        else
+                            table.insert(ids, mid)
+                            if # ids == count then
+                                break
+                            end
+                        end
+                    end
+                end
+                if # members < window then
+                    break
+                end
+                offset = offset + window
+            end
+        end
+        if tkey then
+            odm.redis.call('del', tkey)
+        end
+        if seek.before then
+            -- ids were collected in reverse order
+            local n = # ids
+            for i = 1, math.floor(n/2) do
+                ids[i], ids[n-i+1] = ids[n-i+1], ids[i]
+            end
+        end
+        return ids
+    end,
+    --
+    -- Ids of the instances with the values of lookups, an array of
+    -- field-value pairs of the id, unique fields or indexed fields.
+    _lookup_ids = function (self, lookups)
+        local ids, keys, id, mid, candidates = {}, {}
+        for i = 1, # lookups, 2 do
+            local field, value = lookups[i], lookups[i+1]
+            if field == self.meta.id_name then
+                mid = value
+            elseif self.meta.indices[field] then
+                mid = odm.redis.call('hget', self:map_key(field), value)
+                if not mid then
+                    return ids
+                end
+            else
+                mid = nil
+                table.insert(keys, self:index_key(field, value))
+            end
+            if mid then
+                if id and id ~= mid then
+                    return ids
+                end
+                id = mid
+            end
+        end
+        if id then
+            candidates = {id}
+            table.insert(keys, self.idset)
+        else
+            -- scan the smallest index
+            table.sort(keys, function (a, b)
+                return self:setsize(a) < self:setsize(b)
+            end)
+            candidates = self:setids(table.remove(keys, 1))
+        end
+        for _, cid in ipairs(candidates) do
+            local matched = true
+            for _, key in ipairs(keys) do
+                if not self:_ismember(key, cid) then
+                    matched = false
+                    break
+                end
+            end
+            if matched then
+                table.insert(ids, cid)
+            end
+        end
+        return ids
+    end,
+    --
+    -- A true value if id is in the query stored at key
+    _ismember = function (self, key, id)
+        if self.meta.sorted then
+            return odm.redis.call('zscore', key, id)
+        else
+            return odm.redis.call('sismember', key, id) + 0 == 1
+        end
+    end,
+    --
+    -- Value of instance id sorted by sort index
+    _sort_value = function (self, sort, id)
+        local value = odm.redis.call('hget', self:object_key(id), sort.field)
+        if value and # sort.nested > 0 then
+            value = odm.redis.call('hget', sort.nested[1] .. ':obj:' .. value,
+                                   sort.nested[2])
+        end
+        return value
+    end,
+    --
+    -- Add id to, or remove it from, a sort index. Members of alphanumeric
+    -- indices are stored in a hash so that they can be removed.
+    _update_sort_index = function (self, sort, id, value, update)
+        if sort.alpha then
+            local mkey = sort.key .. ':m'
+            local member = odm.redis.call('hget', mkey, id)
+            if member then
+                odm.redis.call('zrem', sort.key, member)
+            end
+            if update then
+                member = (value or '') .. odm.LEX_SEPARATOR .. id
+                odm.redis.call('zadd', sort.key, 0, member)
+                odm.redis.call('hset', mkey, id, member)
+            else
+                odm.redis.call('hdel', mkey, id)
+            end
+        elseif update then
+            odm.redis.call('zadd', sort.key, tonumber(value) or 0, id)
+        else
+            odm.redis.call('zrem', sort.key, id)
+        end
+    end,
+    --
+    -- Update the sort indices of models sorted by a field of instance id
+    _update_sort_dependents = function (self, id, fields)
+        local idkey = self:object_key(id)
+        for _, dep in ipairs(self.meta.sort_dependents or {}) do
+            if not fields or fields[dep.field] then
+                local value = odm.redis.call('hget', idkey, dep.field)
+                for _, rid in ipairs(redis_members(dep.index .. ':' .. id)) do
+                    self:_update_sort_index(dep, rid, value, true)
+                end
+            end
+        end
+    end,
+    --
+    -- Load the fields of instances ids. If fields is empty, all fields
+    -- are loaded. If it contains the id only, ids are returned.
+    _load_fields = function (self, ids, fields)
+        local result = {}
+        if fields and # fields > 0 then
+            if # fields == 1 and fields[1] == self.meta.id_name then
+                return ids
+            end
+            for _, id in ipairs(ids) do
+                table.insert(result, {id, odm.redis.call('hmget', self:object_key(id), unpack(fields))})
+            end
+        else
+            for _, id in ipairs(ids) do
+                table.insert(result, {id, odm.redis.call('hgetall', self:object_key(id))})
+            end
+        end
+        return result
+    end,
     --
     -- Load related objects with their fields
     _load_related = function (self, result, related)
@@ -611,13 +1799,55 @@ else
         load = function(self, model, keys, options, args)
             return model:load(first_key(keys), cjson.decode(options))
         end,
+        -- Load instances from a list of ids
+        get = function(self, model, keys, options, args)
+            return model:get(args, cjson.decode(options))
+        end,
+        -- get an instance or create it
+        get_or_create = function(self, model, keys, num, args)
+            num = 2*num
+            return model:get_or_create(tabletools.slice(args, 1, num),
+                                       tabletools.slice(args, num+1, -1))
+        end,
         -- delete a query
         delete = function(self, model, keys, ...)
             return model:delete(first_key(keys))
         end,
+        -- intersect queries
+        intersect = function(self, model, keys, specs, args)
+            return model:intersect(first_key(keys), keys, cjson.decode(specs))
+        end,
+        -- generations of the models in a materialized query
+        materialized = function(self, model, keys, ...)
+            return model:materialized(keys[1], tabletools.slice(keys, 2, -1))
+        end,
+        -- store a query into its materialized key
+        materialize = function(self, model, keys, expire, args)
+            return model:materialize(keys[1], keys[2], expire)
+        end,
+        -- aggregate fields of a query
+        summarize = function(self, model, keys, group, args)
+            return model:summarize(first_key(keys), group, args)
+        end,
+        -- count the ids of a query for each value of indexed fields
+        facets = function(self, model, keys, top, args)
+            return model:facets(first_key(keys), top + 0, args)
+        end,
         -- recursively add id to a set
         aggregate = function(self, model, keys, field, args)
             return model:aggregate(first_key(keys), field)
+        end,
+        -- increment a field of a query
+        increment = function(self, model, keys, field, args)
+            return model:increment(first_key(keys), field, args[1],
+                                   args[2] == '1', args[3] == '1')
+        end,
+        -- update fields of a query
+        update = function(self, model, keys, score, args)
+            if score == '' then
+                score = nil
+            end
+            return model:update(first_key(keys), score, args)
         end
     }
     -- THE FIRST ARGUMENT IS THE NAME OF THE SCRIPT
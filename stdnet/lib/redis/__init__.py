@@ -8,4 +8,9 @@ from .pubsub import *
 try:
     from . import async
 except ImportError:
+    pass
+
+try:
+    from . import aio
+except ImportError:     #pragma    nocover
     pass
\ No newline at end of file
@@ -0,0 +1,276 @@
+'''Asynchronous Redis Connection for the asyncio_ event loop.
+
+Requires python 3.5 or 3.6. From python 3.7 ``async`` is a reserved keyword
+and stdnet cannot be imported, since it is the name of the pulsar
+:mod:`stdnet.lib.redis.async` module and of
+:meth:`stdnet.BackendDataServer.async`.
+
+Use the :class:`RedisConnection` as the ``connection_class`` of a backend::
+
+    from stdnet import getdb
+    from stdnet.lib.redis.aio import RedisConnection
+
+    backend = getdb('redis://127.0.0.1:6379?db=7',
+                    connection_class=RedisConnection)
+
+Commands, :meth:`stdnet.odm.Session.commit`, :meth:`stdnet.odm.Query.items`,
+:meth:`stdnet.odm.Manager.get_or_create`, :meth:`stdnet.odm.Manager.get_many`,
+:meth:`stdnet.odm.Manager.bulk_create` and structure methods then return a
+:class:`RedisRequest` which can be awaited in an asyncio coroutine.
+
+Since the event loop runs in one thread, do not set the ``blocking_timeout``
+of the connection pool.
+
+.. _asyncio: http://docs.python.org/3/library/asyncio.html
+'''
+import asyncio
+from collections import deque
+from functools import partial
+
+from stdnet import BackendDataServer, BackendRequest, getdb
+
+from . import connection
+from .connection import NOT_READY
+from .exceptions import RedisConnectionError
+
+ensure_future = getattr(asyncio, 'ensure_future', None) or\
+                getattr(asyncio, 'async')
+
+
+class RedisRequest(connection.RedisRequest):
+    '''A :class:`stdnet.lib.redis.RedisRequest` for asyncio. Callbacks added
+with :meth:`add_callback` are chained: each one receives the result of the
+previous one and, if a callback returns another request, the chain continues
+once that request has a result. An exception stops the callbacks and goes to
+the errbacks.'''
+    def __init__(self, *args, **kwargs):
+        super(RedisRequest, self).__init__(*args, **kwargs)
+        self._callbacks = deque()
+        self._result = NOT_READY
+        self._paused = False
+        self._loop = self.connection.loop
+
+    @property
+    def done(self):
+        return self._result is not NOT_READY and not self._paused
+
+    @property
+    def result(self):
+        '''The result once :attr:`done`.'''
+        return self._result if self.done else None
+
+    def add_callback(self, callback, errback=None):
+        self._callbacks.append((callback, errback))
+        if self.done:
+            self._run_callbacks()
+        return self
+
+    def __await__(self):
+        future = asyncio.Future(loop=self._loop)
+        self.add_callback(partial(_set_result, future),
+                          partial(_set_exception, future))
+        return iter(future)
+
+    def execute(self):
+        connected = self.connection.connect(self)
+        if connected is None:
+            self._send()
+        else:
+            connected.add_done_callback(self._connected)
+        return self
+
+    #    INTERNALS
+    def _connected(self, future):
+        exc = future.exception()
+        if exc is not None:
+            self.connection.disconnect()
+            self._resolve(exc)
+        else:
+            self._send()
+
+    def _send(self):
+        c = self.connection
+        c._request = self
+        try:
+            self.send()
+        except Exception as e:
+            c._request = None
+            c.disconnect()
+            self._resolve(e)
+
+    def _resolve(self, result):
+        # Called once the response from the server is available. The
+        # response can be another request, when missing scripts are loaded.
+        if isinstance(result, BackendRequest) and result is not self:
+            self._paused = True
+            result.add_callback(self._resume, self._resume)
+        else:
+            self._result = result
+            self._run_callbacks()
+
+    def _resume(self, result):
+        self._paused = False
+        self._resolve(result)
+        return result
+
+    def _run_callbacks(self):
+        callbacks = self._callbacks
+        while callbacks and not self._paused:
+            callback, errback = callbacks.popleft()
+            result = self._result
+            fn = errback if isinstance(result, Exception) else callback
+            if fn is None:
+                continue
+            try:
+                result = fn(result)
+            except Exception as e:
+                result = e
+            if isinstance(result, BackendRequest) and result is not self:
+                self._paused = True
+                result.add_callback(self._resume, self._resume)
+            elif result is not self:
+                self._result = result
+
+
+def _set_result(future, result):
+    if not future.done():
+        future.set_result(result)
+    return result
+
+def _set_exception(future, exc):
+    if not future.done():
+        future.set_exception(exc)
+    return exc
+
+
+class RedisProtocol(asyncio.Protocol):
+    '''The asyncio protocol of a :class:`RedisConnection`.'''
+    def __init__(self, connection):
+        self.connection = connection
+
+    def data_received(self, data):
+        self.connection.data_received(data)
+
+    def connection_lost(self, exc):
+        self.connection.connection_lost(exc)
+
+
+class RedisConnection(connection.Connection):
+    '''A :class:`stdnet.lib.redis.Connection` using an asyncio transport.
+A connection handles one :class:`RedisRequest` at a time.'''
+    request_class = RedisRequest
+
+    def __init__(self, pool, reader_class=None):
+        super(RedisConnection, self).__init__(pool, reader_class)
+        self._loop = None
+        self._request = None
+
+    @property
+    def loop(self):
+        '''The event loop of this connection.'''
+        return self._loop or asyncio.get_event_loop()
+
+    def connect(self, request):
+        '''Connects to the Redis server if not already connected. Return
+``None`` if already connected, otherwise an :class:`asyncio.Future` called
+back once the connection is made and initialised.'''
+        if self._sock is not None:
+            return
+        self._loop = loop = asyncio.get_event_loop()
+        factory = lambda: RedisProtocol(self)
+        if self.socket_type == 'TCP':
+            host, port = self.address
+            coro = loop.create_connection(factory, host, port)
+        else:
+            coro = loop.create_unix_connection(factory, self.address)
+        connected = asyncio.Future(loop=loop)
+        task = ensure_future(coro, loop=loop)
+        task.add_done_callback(partial(self._connection_made, request,
+                                       connected))
+        return connected
+
+    def on_connect(self, request):
+        '''Authenticate and select a database. Return a :class:`RedisRequest`
+or ``None``.'''
+        client = request.client.client
+        commands = []
+        if self.password:
+            commands.append(('AUTH', self.password, 'Invalid Password'))
+        if self.db:
+            commands.append(('SELECT', self.db,
+                             'Invalid Database "%s"' % self.db))
+        return self._initialise(client, commands)
+
+    def disconnect(self, release_connection=True):
+        "Disconnects from the Redis server"
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        self._loop = None
+        if release_connection:
+            self.pool.release(self)
+
+    def send(self, data):
+        if isinstance(data, list):
+            self._sock.writelines(data)
+        else:
+            self._sock.write(data)
+
+    def data_received(self, data):
+        request = self._request
+        if request is None:
+            return
+        try:
+            response = request.parse(data)
+        except Exception as e:
+            response = e
+        if response is not NOT_READY:
+            self._request = None
+            request._resolve(response)
+
+    def connection_lost(self, exc):
+        self._sock = None
+        self._loop = None
+        request, self._request = self._request, None
+        if request is not None:
+            request._resolve(RedisConnectionError(
+                                'Connection lost. %s' % (exc or '')))
+
+    #    INTERNALS
+    def _connection_made(self, request, connected, task):
+        try:
+            self._sock = task.result()[0]
+        except Exception as e:
+            connected.set_exception(
+                        RedisConnectionError(self._error_message(e)))
+            return
+        result = self.on_connect(request)
+        if result is None:
+            connected.set_result(True)
+        else:
+            result.add_callback(partial(_set_result, connected),
+                                partial(_set_exception, connected))
+
+    def _initialise(self, client, commands):
+        if commands:
+            command, arg, msg = commands[0]
+            return self.request(client, command, arg,
+                                release_connection=False).execute()\
+                       .add_callback(partial(self._check, client, commands))
+
+    def _check(self, client, commands, response):
+        if not response:
+            raise RedisConnectionError(commands[0][2])
+        return self._initialise(client, commands[1:])
+
+
+def async_handler(backend):
+    if backend.client.connection_pool.connection_class == RedisConnection:
+        return backend
+    else:
+        return getdb(backend.connection_string,
+                     connection_class=RedisConnection)
+
+
+# Register the asynchronous handler if pulsar is not available
+BackendDataServer.async_handlers.setdefault('redis', async_handler)
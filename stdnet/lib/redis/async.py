@@ -40,7 +40,10 @@ class RedisRequest(Deferred, connection.RedisRequest):
         return self
     
     def _write(self, result=None):
-        return self.connection.sock.write(self.command)
+        command = self.command
+        if isinstance(command, list):
+            command = b''.join(command)
+        return self.connection.sock.write(command)
 
     @async(max_errors=1)    
     def read_response(self, result=None):
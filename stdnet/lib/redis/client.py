@@ -275,14 +275,17 @@ class Redis(object):
         c.connection_pool = self.connection_pool.clone(**kwargs)
         return c
 
-    def pipeline(self):
+    def pipeline(self, transaction=True):
         """
 Return a new :class:`Pipeline` that can queue multiple commands for
 later execution. Apart from making a group of operations
 atomic, pipelines are useful for reducing the back-and-forth overhead
 between the client and server.
+
+:parameter transaction: if ``True`` (default) commands are wrapped with
+    MULTI and EXEC calls and executed atomically.
 """
-        return Pipeline(self)
+        return Pipeline(self, transaction)
     
     def prefixed(self, prefix):
         '''Return a new :class:`PrefixedRedis` client'''
@@ -1242,9 +1245,9 @@ to the Redis server in one transmission.
 This is convenient for batch processing, such as
 saving all the values in a list to Redis.
 
-All commands executed within a pipeline are wrapped with MULTI and EXEC
-calls. This guarantees all commands executed in the pipeline will be
-executed atomically.
+When :attr:`transaction` is ``True``, all commands executed within a
+pipeline are wrapped with MULTI and EXEC calls. This guarantees all commands
+executed in the pipeline will be executed atomically.
 
 Check `redis transactions <http://redis.io/topics/transactions>`_
 for further information.
@@ -1257,14 +1260,22 @@ Code iterating over the response list should be able to deal with an
 instance of an exception as a potential value. In general, these will be
 RedisInvalidResponse exceptions, such as those raised when issuing a command
 on a key of a different datatype.
+
+.. attribute:: transaction
+
+    If ``False`` commands are sent without the MULTI and EXEC wrapping and
+    the server replies to each one of them as soon as it is executed.
+    Commands from other clients can run in between.
 """
-    def __init__(self, client):
+    def __init__(self, client, transaction=True):
         super(Pipeline,self).__init__(client)
+        self.transaction = transaction
         self.reset()
 
     def reset(self):
         self.command_stack = []
-        self.execute_command('MULTI')
+        if self.transaction:
+            self.execute_command('MULTI')
 
     @property
     def pipelined(self):
@@ -1272,7 +1283,7 @@ on a key of a different datatype.
     
     @property
     def empty(self):
-        return len(self.command_stack) <= 1
+        return len(self.command_stack) <= int(self.transaction)
 
     def execute_command(self, cmnd, *args, **options):
         """
@@ -1317,8 +1328,12 @@ Several callbacks can be added for a given command::
         return self
 
     def parse_response(self, request):
-        response = request.response[-1]
-        commands = request.args[1:-1]
+        if self.transaction:
+            response = request.response[-1]
+            commands = request.args[1:-1]
+        else:
+            response = request.response
+            commands = request.args
         if len(response) != len(commands):
             raise RedisInvalidResponse("Wrong number of response items from "
                                        "pipeline execution")
@@ -1336,7 +1351,8 @@ Several callbacks can be added for a given command::
             return processed
 
     def request(self, load_script=False):
-        self.execute_command('EXEC')
+        if self.transaction:
+            self.execute_command('EXEC')
         commands = self.command_stack
         self.reset()
         conn = self.connection_pool.get_connection()
@@ -1346,4 +1362,6 @@ Several callbacks can be added for a given command::
         
     def execute(self, load_script=False):
         '''Execute all commands in the current pipeline.'''
+        if not self.command_stack:
+            return []
         return self.request(load_script).execute()
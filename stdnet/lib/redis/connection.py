@@ -37,9 +37,13 @@ To obtain the buffer sizes used by the socket you can use
 import os
 import errno
 import socket
+import select
 import io
+import time
+import threading
 from copy import copy
-from itertools import chain, starmap
+from collections import deque
+from itertools import chain, islice
 
 from stdnet import BackendRequest
 from stdnet.conf import settings
@@ -78,6 +82,32 @@ class NOT_READY:
     pass
 
 
+# Maximum number of buffers in a single sendmsg call
+IOV_MAX = 1024
+# Protocol headers for the most common lengths
+HEADERS_SIZE = 1024
+BULK_HEADERS = tuple(('$%d\r\n' % n).encode('ascii')
+                     for n in range(HEADERS_SIZE))
+MULTI_BULK_HEADERS = tuple(('*%d\r\n' % n).encode('ascii')
+                           for n in range(HEADERS_SIZE))
+
+def bulk_header(size):
+    if size < HEADERS_SIZE:
+        return BULK_HEADERS[size]
+    else:
+        return ('$%d\r\n' % size).encode('ascii')
+    
+def multi_bulk_header(size):
+    if size < HEADERS_SIZE:
+        return MULTI_BULK_HEADERS[size]
+    else:
+        return ('*%d\r\n' % size).encode('ascii')
+    
+def byte_view(data):
+    view = memoryview(data)
+    return view if view.format == 'B' and view.ndim == 1 else view.cast('B')
+
+
 class RedisRequest(BackendRequest):
     '''Redis request base class. A request instance manages the
 handling of a single command from start to the response from the server.
@@ -103,6 +133,11 @@ handling of a single command from start to the response from the server.
 .. attribute:: pooling
 
     The request is pooling data from redis server.
+    
+.. attribute:: raw_response
+
+    The data received from the server. Available only when
+    ``settings.REDIS_RAW_RESPONSE`` is ``True``, otherwise an empty bytes.
 '''
     _polling = False
     def __init__(self, client, connection, command_name, args,
@@ -113,7 +148,7 @@ handling of a single command from start to the response from the server.
         self.args = args
         self.release_connection = release_connection
         self.options = options
-        self._raw_response = []
+        self._raw_response = [] if settings.REDIS_RAW_RESPONSE else None
         self._response = None
         self.response = connection.parser.gets()
         # if the command_name is missing, it means it is a pipeline of commands
@@ -141,7 +176,7 @@ handling of a single command from start to the response from the server.
     
     @property
     def raw_response(self):
-        return b''.join(self._raw_response)
+        return b''.join(self._raw_response or ())
     
     @property
     def polling(self):
@@ -170,7 +205,8 @@ handling of a single command from start to the response from the server.
         
     def parse(self, data):
         '''Got data from redis, feeds it to the :attr:`Connection.parser`.'''
-        self._raw_response.append(data)
+        if self._raw_response is not None:
+            self._raw_response.append(bytes(data))
         parser = self.connection.parser
         parser.feed(data)
         if self.is_pipeline:
@@ -200,7 +236,7 @@ handling of a single command from start to the response from the server.
         return self._write()
     
     def _write(self):
-        return self.connection.sock.sendall(self.command)
+        return self.connection.send(self.command)
     
     def execute(self):
         raise NotImplementedError()
@@ -234,10 +270,9 @@ class SyncRedisRequest(RedisRequest):
     def read_response(self):
         '''Read a redis response from the socket and parse it.'''
         response = NOT_READY
-        sock = self.connection.sock
+        recv = self.connection.recv
         while response is NOT_READY:
-            stream = sock.recv(io.DEFAULT_BUFFER_SIZE)
-            response = self.parse(stream)
+            response = self.parse(recv())
         return response
     
     def poll(self, num_messages=None, timeout=None):
@@ -277,15 +312,24 @@ This class should not be directly initialized. Instead use the
 .. attribute:: sock
 
     Python socket which handle the sending and receiving of data.
+    
+.. attribute:: zero_copy_size
+
+    Pipeline arguments of this size or larger are sent without being copied
+    into the write buffer.
 '''
     request_class = SyncRedisRequest
     socket_class = socket.socket
     encoding_errors = 'strict'
+    zero_copy_size = 16*1024
+    last_used = 0
     
     "Manages TCP communication to and from a Redis server"
     def __init__(self, pool, reader_class=None):
         self.pool = pool
         self._sock = None
+        self._buffer = bytearray()
+        self._read_buffer = None
         if reader_class is None:
             if settings.REDIS_PY_PARSER:
                 reader_class = PyRedisReader
@@ -341,6 +385,10 @@ This class should not be directly initialized. Instead use the
     def READ_BUFFER_SIZE(self):
         return self.pool.READ_BUFFER_SIZE
     
+    @property
+    def MAX_READ_BUFFER_SIZE(self):
+        return self.pool.MAX_READ_BUFFER_SIZE
+    
     def connect(self, request):
         "Connects to the Redis server if not already connected."
         if self._sock:
@@ -410,36 +458,110 @@ This class should not be directly initialized. Instead use the
         if release_connection:
             self.pool.release(self)
 
+    def recv(self):
+        '''Receive data from the server into the connection read buffer and
+return a view of the data received. The buffer doubles, up to
+:attr:`MAX_READ_BUFFER_SIZE`, when a read fills it and halves, down to
+:attr:`READ_BUFFER_SIZE`, when a read uses less than a quarter of it.'''
+        buffer = self._read_buffer
+        if buffer is None:
+            buffer = self._read_buffer = bytearray(self.READ_BUFFER_SIZE)
+        capacity = len(buffer)
+        size = self.sock.recv_into(buffer)
+        if not size:
+            raise socket.error('Connection closed by the server')
+        if size == capacity and capacity < self.MAX_READ_BUFFER_SIZE:
+            self._read_buffer = bytearray(2*capacity)
+        elif size < capacity//4 and capacity > self.READ_BUFFER_SIZE:
+            self._read_buffer = bytearray(capacity//2)
+        # the view keeps the buffer alive even if replaced
+        return memoryview(buffer)[:size] if ispy3k else buffer[:size]
+    
+    def send(self, data):
+        '''Send *data* to the server. *data* is either bytes or a list of
+buffers from :meth:`pack_pipeline`, sent with a scatter-gather ``sendmsg``
+when the socket supports it.'''
+        sock = self.sock
+        if not isinstance(data, list):
+            return sock.sendall(data)
+        elif len(data) > 1 and hasattr(sock, 'sendmsg'):
+            views = deque(byte_view(b) for b in data if len(b))
+            try:
+                while views:
+                    sent = sock.sendmsg(list(islice(views, IOV_MAX)))
+                    while sent:
+                        size = len(views[0])
+                        if sent >= size:
+                            views.popleft()
+                            sent -= size
+                        else:
+                            views[0] = views[0][sent:]
+                            sent = 0
+                return
+            except NotImplementedError:   #pragma    nocover
+                # ssl sockets, nothing was sent
+                pass
+        return sock.sendall(b''.join(data))
+    
     if ispy3k:
         def encode(self, value):
-            return value if isinstance(value, bytes) else str(value).encode(
-                                        self.encoding,self.encoding_errors)
+            if isinstance(value, (bytes, bytearray, memoryview)):
+                return value
+            else:
+                return str(value).encode(self.encoding, self.encoding_errors)
             
     else:   #pragma    nocover
         def encode(self, value):
-            if isinstance(value,unicode):
+            if isinstance(value, unicode):
                 return value.encode(self.encoding, self.encoding_errors)
+            elif isinstance(value, bytearray):
+                return value
+            elif isinstance(value, memoryview):
+                return value.tobytes()
             else:
                 return str(value)
     
-    def __pack_gen(self, args):
+    def _pack(self, args, chunks=None):
+        # Pack args into the write buffer. When a list of chunks is given,
+        # large arguments are appended to it without being copied.
+        buffer = self._buffer
         e = self.encode
-        crlf = b'\r\n'
-        yield e('*%s\r\n'%len(args))
-        for value in map(e, args):
-            yield e('$%s\r\n'%len(value))
-            yield value
-            yield crlf
-    
+        buffer += multi_bulk_header(len(args))
+        for value in args:
+            value = e(value)
+            size = value.nbytes if isinstance(value, memoryview) else\
+                   len(value)
+            buffer += bulk_header(size)
+            if chunks is not None and size >= self.zero_copy_size:
+                chunks.append(bytes(buffer))
+                chunks.append(value)
+                del buffer[:]
+            else:
+                buffer += value
+            buffer += b'\r\n'
+            
     def pack_command(self, *args):
         "Pack a series of arguments into a value Redis command"
-        return b''.join(self.__pack_gen(args))
+        buffer = self._buffer
+        del buffer[:]
+        self._pack(args)
+        command = bytes(buffer)
+        del buffer[:]
+        return command
     
     def pack_pipeline(self, commands):
         '''Internal function for packing pipeline commands into a
-command byte to be send to redis.'''
-        pack = self.pack_command
-        return b''.join(starmap(pack, ((c.command,)+c.args for c in commands)))
+list of buffers to be send to redis. Arguments larger than
+:attr:`zero_copy_size` are not copied.'''
+        buffer = self._buffer
+        del buffer[:]
+        chunks = []
+        for c in commands:
+            self._pack((c.command,)+c.args, chunks)
+        if buffer:
+            chunks.append(bytes(buffer))
+            del buffer[:]
+        return chunks
         
     def request(self, client, command_name, *args, **options):
         return self.request_class(client, self, command_name, args, **options)
@@ -447,17 +569,59 @@ command byte to be send to redis.'''
 ConnectionClass = None
 
 
+def is_stale(sock):
+    '''``True`` if an idle socket is readable, which means it was closed by
+the server or it has unexpected data.'''
+    if not isinstance(sock, socket.socket):
+        return False
+    try:
+        return bool(select.select([sock], [], [], 0)[0])
+    except (ValueError, select.error, socket.error):
+        return True
+    
+def seconds(value):
+    return None if value is None else float(value)
+    
+
 class ConnectionPool(object):
-    "A :class:`Redis` :class:`Connection` pool."
+    '''A :class:`Redis` :class:`Connection` pool. It can be shared between
+threads.
+
+.. attribute:: max_connections
+
+    Maximum number of connections created by the pool.
+    
+.. attribute:: blocking_timeout
+
+    If not ``None``, the number of seconds :meth:`get_connection` waits for
+    a connection to be released once :attr:`max_connections` are in use,
+    otherwise it raises a :class:`RedisConnectionError` straight away.
+    
+.. attribute:: idle_timeout
+
+    If not ``None``, connections not used for this number of seconds are
+    disconnected and removed from the pool.
+    
+.. attribute:: health_check_interval
+
+    If not ``None``, a connection idle for this number of seconds or more is
+    checked before being handed out. If the server closed its socket, the
+    connection reconnects.
+'''
     connection_pools = {}
     WRITE_BUFFER_SIZE = 128 * 1024
     READ_BUFFER_SIZE = io.DEFAULT_BUFFER_SIZE
+    MAX_READ_BUFFER_SIZE = 1024 * 1024
     encoding = 'utf-8'
+    blocking_timeout = None
+    idle_timeout = None
+    health_check_interval = None
     
     @classmethod
     def create(cls, address=None, connection_class=None, db=0,
                max_connections=None, encoding=None,
-               socket_timeout=None, password=None):
+               socket_timeout=None, password=None, blocking_timeout=None,
+               idle_timeout=None, health_check_interval=None):
         if not address:
             raise ValueError('Redis connection address not supplied')
         o = ConnectionPool()
@@ -469,7 +633,11 @@ class ConnectionPool(object):
         o.encoding = encoding or cls.encoding
         o.socket_timeout = socket_timeout
         if o not in cls.connection_pools:
-            o.max_connections = max_connections or settings.MAX_CONNECTIONS
+            o.max_connections = int(max_connections or
+                                    settings.MAX_CONNECTIONS)
+            o.blocking_timeout = seconds(blocking_timeout)
+            o.idle_timeout = seconds(idle_timeout)
+            o.health_check_interval = seconds(health_check_interval)
             o._init()
             cls.connection_pools[o] = o
         return cls.connection_pools[o]
@@ -478,6 +646,7 @@ class ConnectionPool(object):
         self._created_connections = 0
         self._available_connections = []
         self._in_use_connections = set()
+        self._lock = threading.Condition(threading.RLock())
 
     def __hash__(self):
         return hash((self.address, self.db, self.connection_class,
@@ -498,12 +667,12 @@ class ConnectionPool(object):
             return False
     
     def get_connection(self):
-        "Get a connection from the pool"
-        try:
-            connection = self._available_connections.pop()
-        except IndexError:
-            connection = self.make_connection()
-        self._in_use_connections.add(connection)
+        """Get a connection from the pool. If :attr:`max_connections` are in
+use, wait up to :attr:`blocking_timeout` seconds for one to be released."""
+        with self._lock:
+            self._reap()
+            connection = self._acquire()
+            self._in_use_connections.add(connection)
         return connection
 
     def make_connection(self):
@@ -515,15 +684,19 @@ class ConnectionPool(object):
 
     def release(self, connection):
         "Releases the connection back to the pool"
-        self._in_use_connections.discard(connection)
-        if connection not in self._available_connections: 
-            self._available_connections.append(connection)
+        with self._lock:
+            self._in_use_connections.discard(connection)
+            if connection not in self._available_connections:
+                connection.last_used = time.time()
+                self._available_connections.append(connection)
+                self._lock.notify()
 
     def disconnect(self):
         "Disconnects all connections in the pool"
-        for connection in list(chain(self._available_connections,
-                                     self._in_use_connections)):
-            connection.disconnect()
+        with self._lock:
+            for connection in list(chain(self._available_connections,
+                                         self._in_use_connections)):
+                connection.disconnect()
 
     def clone(self, **kwargs):
         c = copy(self)
@@ -535,4 +708,41 @@ class ConnectionPool(object):
         if c not in self.connection_pools:
             self.connection_pools[c] = c
         return self.connection_pools[c]
-        
\ No newline at end of file
+    
+    #    INTERNALS
+    def _acquire(self):
+        # Must be called with the lock held
+        available = self._available_connections
+        deadline = None
+        while True:
+            if available:
+                return self._check(available.pop())
+            elif self._created_connections < self.max_connections or\
+                    self.blocking_timeout is None:
+                return self.make_connection()
+            if deadline is None:
+                deadline = time.time() + self.blocking_timeout
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise RedisConnectionError("Timeout waiting for a connection")
+            self._lock.wait(remaining)
+            
+    def _check(self, connection):
+        # Disconnect an idle connection whose socket is stale, it reconnects
+        # when used.
+        interval = self.health_check_interval
+        if interval is not None and connection.sock is not None and\
+                time.time() - connection.last_used >= interval and\
+                is_stale(connection.sock):
+            connection.disconnect(release_connection=False)
+        return connection
+            
+    def _reap(self):
+        # Remove connections idle for more than idle_timeout seconds. The
+        # least recently used connections are at the start of the list.
+        if self.idle_timeout is not None:
+            available = self._available_connections
+            expiry = time.time() - self.idle_timeout
+            while available and available[0].last_used < expiry:
+                available.pop(0).disconnect(release_connection=False)
+                self._created_connections -= 1
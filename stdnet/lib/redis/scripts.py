@@ -145,7 +145,7 @@ It returns the result of the `evalsha` command.'''
             if not client.pipelined:
                 num_keys = args[1]
                 keys, args = args[2:2+num_keys],args[2+num_keys:]
-                pipe = client.pipeline()
+                pipe = client.pipeline(transaction=False)
                 self.load(pipe, keys, *args, **options)
                 result = pipe.execute()
                 if isinstance(result, RedisRequest):
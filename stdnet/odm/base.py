@@ -112,6 +112,8 @@ class of :class:`StdModel` in the following way::
 :parameter ordering: Check the :attr:`ordering` attribute.
 :parameter app_label: Check the :attr:`app_label` attribute.
 :parameter modelkey: Check the :attr:`modelkey` attribute.
+:parameter sort_indexes: Check the :attr:`sort_indexes` attribute.
+:parameter indexes: Check the :attr:`indexes` attribute.
 
 **Attributes and methods**:
 
@@ -156,6 +158,18 @@ mapper.
     List of :class:`Field` which are indices (:attr:`Field.index` attribute
     set to ``True``).
 
+.. attribute:: indexes
+
+    Tuple of compound indexes. A compound index is a tuple of names of
+    two or more indexed fields which are not unique. The backend server
+    keeps a set of ids for each combination of values of the fields, and
+    it uses it for queries filtering by a value of each field::
+
+        class Meta:
+            indexes = [('country', 'status')]
+
+    Default: ``()``.
+
 .. attribute:: modelkey
 
     Override the modelkey which is by default given by ``app_label.name``
@@ -165,12 +179,25 @@ mapper.
 .. attribute:: pk
 
     The :class:`Field` representing the primary key.
+
+.. attribute:: sort_indexes
+
+    Tuple of field names, or ``field__name`` for a field of a model
+    related by an indexed :class:`ForeignKey`, whose values are kept in
+    sorted indexes by the backend server. Queries explicitly sorted by
+    one of these fields are sorted using the index::
+
+        class Meta:
+            sort_indexes = ('created', 'author__name')
+
+    Default: ``()``.
 '''
     searchengine = None
     connection_string = None
 
     def __init__(self, model, fields, abstract=False, app_label='',
-                 verbose_name=None, ordering=None, modelkey=None, **kwargs):
+                 verbose_name=None, ordering=None, modelkey=None,
+                 sort_indexes=None, indexes=None, **kwargs):
         super(Metaclass,self).__init__(model,
                                        app_label=app_label,
                                        modelkey=modelkey,
@@ -204,6 +231,29 @@ mapper.
         self.ordering = None
         if ordering:
             self.ordering = self.get_sorting(ordering, ImproperlyConfigured)
+        self.sort_indexes = tuple(sort_indexes or ())
+        for name in self.sort_indexes:
+            bits = name.split(JSPLITTER)
+            field = self.dfields.get(bits[0])
+            if field is None or field in self.multifields:
+                valid = False
+            elif len(bits) == 1 or field.type == 'json object':
+                valid = True
+            else:
+                # nested sort indexes are updated via the foreign key index
+                valid = len(bits) == 2 and field.type == 'related object'\
+                            and field.index
+            if not valid:
+                raise ImproperlyConfigured('Cannot use "{0}" as sort index '
+                                           'of {1}.'.format(name, self))
+        self.indexes = tuple((tuple(names) for names in indexes or ()))
+        for names in self.indexes:
+            fields = [self.dfields.get(name) for name in names]
+            if len(set(names)) < 2 or not all((field is not None and\
+                    field.index and not field.unique and\
+                    field not in self.multifields for field in fields)):
+                raise ImproperlyConfigured('Cannot use {0} as compound index '
+                                           'of {1}.'.format(names, self))
 
     def pkname(self):
         '''Primary key name. A shortcut for ``self.pk.name``.'''
@@ -267,6 +317,21 @@ Return ``True`` if the instance is ready to be saved to database.'''
         raise errorClass('Cannot Order by attribute "{0}".\
  It is not a scalar field.'.format(sortby))
 
+    def sort_index(self, ordering):
+        '''The name in :attr:`sort_indexes` matching *ordering*, as returned
+by :meth:`get_sorting`, or ``None``.'''
+        name = ordering.field.name
+        nested = ordering.nested
+        if nested:
+            if nested.nested:
+                return
+            name = '%s%s%s' % (name, JSPLITTER, nested.field.name)
+        elif ordering.name != ordering.field.attname:
+            # a JSON field attribute
+            name = ordering.name
+        if name in self.sort_indexes:
+            return name
+
     def backend_fields(self, fields):
         '''Return a two elements tuple containing a list
 of fields names and a list of field attribute names.'''
@@ -310,7 +375,14 @@ of fields names and a list of field attribute names.'''
                 'autoincr': self.ordering and self.ordering.auto,
                 'multi_fields': [field.name for field in self.multifields],
                 'indices': dict(((idx.attname, idx.unique)\
-                                for idx in self.indices))}
+                                for idx in self.indices)),
+                'ranges': [idx.attname for idx in self.indices\
+                           if idx.range_index],
+                'prefixes': [field.attname for field in self.scalarfields\
+                             if field.prefix_index],
+                'compound_indices': [[self.dfields[name].attname\
+                                      for name in names]\
+                                     for names in self.indexes]}
 
 class autoincrement(object):
     '''An :class:`autoincrement` is used in a :class:`StdModel` Meta
@@ -397,12 +469,16 @@ def meta_options(abstract=False,
                  ordering=None,
                  modelkey=None,
                  unique_together=None,
+                 sort_indexes=None,
+                 indexes=None,
                  **kwargs):
     return {'abstract': abstract,
             'app_label':app_label,
             'ordering':ordering,
             'modelkey':modelkey,
-            'unique_together':unique_together}
+            'unique_together':unique_together,
+            'sort_indexes':sort_indexes,
+            'indexes':indexes}
 
 
 class ModelState(object):
@@ -148,12 +148,23 @@ Each field is specified as a :class:`StdModel` class attribute.
     This attribute is used by the :class:`StdModel.fieldvalue_pairs` method
     which returns a dictionary of field names and values.
 
+    Default ``False``.
+
+.. attribute:: range_index
+
+    If ``True`` and the field is an :attr:`index`, the backend server
+    maintains a sorted index of the field values so that range lookups
+    (``gt``, ``ge``, ``lt`` and ``le``) do not need to scan the whole
+    model. Set by numeric and date fields.
+
     Default ``False``.
 '''
     _default = None
     type = None
     python_type = None
     index = True
+    range_index = False
+    prefix_index = False
     ordered = False
     charset = None
     hidden = False
@@ -369,6 +380,7 @@ class IntegerField(AtomField):
     type = 'integer'
     internal_type = 'numeric'
     python_type = int
+    range_index = True
 
     @field_value_error
     def to_python(self, value):
@@ -396,6 +408,7 @@ a :class:`datetime.date` instance.'''
     internal_type = 'numeric'
     python_type = date
     ordered = True
+    range_index = True
     _default = None
 
     @field_value_error
@@ -446,7 +459,20 @@ class SymbolField(AtomField):
     '''An :class:`AtomField` which contains a ``symbol``.
 A symbol holds a unicode string as a single unit.
 A symbol is irreducible, and are often used to hold names, codes
-or other entities. They are indexes by default.'''
+or other entities. They are indexes by default.
+
+:parameter prefix_index: Set the :attr:`prefix_index` attribute.
+
+    Default ``False``.
+
+.. attribute:: prefix_index
+
+    If ``True`` the backend server maintains a lexicographic index of
+    the field values so that ``startswith`` and ``endswith`` lookups
+    are resolved without scanning the whole model.
+    It can be used by :class:`CharField` too, even if they are not indices.
+    For redis it requires version 2.8.9 or higher.
+'''
     type = 'text'
     python_type = string_type
     internal_type = 'text'
@@ -456,6 +482,10 @@ or other entities. They are indexes by default.'''
     def get_encoder(self, params):
         return encoders.Default(self.charset)
 
+    def _handle_extras(self, prefix_index=False, **extras):
+        self.prefix_index = prefix_index
+        super(SymbolField, self)._handle_extras(**extras)
+
     @field_value_error
     def to_python(self, value):
         value = super(SymbolField,self).to_python(value)
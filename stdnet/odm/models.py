@@ -195,6 +195,27 @@ attribute set to ``True`` will be excluded.'''
                 if field is not None:
                     setattr(self,field.attname,getattr(obj,field.attname,None))
 
+    def increment(self, field, by=1):
+        '''Increment the numeric *field* of this persistent instance by *by*
+on the backend server, without saving the instance. The attribute is set to
+the new value, which is also returned. Check :meth:`Query.increment`.'''
+        if not self.state().persistent:
+            raise ValueError('Cannot increment a non persistent instance.')
+        meta = self._meta
+        kwargs = {meta.pkname(): self.pkvalue()}
+        qs = self.obtain_session().query(self.__class__).filter(**kwargs)
+        values = qs.increment(field, by)
+        if not values:
+            raise self.DoesNotExist()
+        value = tuple(values.values())[0]
+        attname = meta.dfields[field].attname
+        setattr(self, attname, value)
+        # so that the next save does not write back the old value
+        loaded = self._dbdata.get('loaded')
+        if loaded is not None:
+            loaded[attname] = value
+        return value
+
     def post_commit(self, callable, **params):
         signals.post_commit.add_callback(lambda *args, **kwargs:\
                                           callable(self, kwargs, **params),
@@ -11,6 +11,9 @@ from .signals import *
 __all__ = ['Q', 'Query', 'QueryElement', 'EmptyQuery',
            'intersect', 'union', 'difference']
 
+aggregate_functions = frozenset(('count', 'sum', 'avg', 'min', 'max'))
+
+
 def iterable(value):
     if isgenerator(value) or isinstance(value,(tuple,list,set,frozenset)):
         return True
@@ -487,6 +490,58 @@ for this function to be available.
             return q
         else:
             return self            
+
+    def materialize(self, timeout=60):
+        '''Return a new :class:`Query` whose result is stored in the backend
+server for *timeout* seconds and reused by identical queries, until a commit
+changes the data of a model in the query. Useful for filters evaluated
+very often::
+
+    qs = session.query(MyModel).filter(group='a').materialize(30)
+
+Queries are identical when they have the same filters, excludes, unions and
+intersections, regardless of their ordering and of the fields they load.
+
+:parameter timeout: number of seconds the result is stored for.
+:rtype: a new :class:`Query`.'''
+        if timeout < 1:
+            raise ValueError('timeout must be a positive integer')
+        q = self._clone()
+        q.data['materialize'] = int(timeout)
+        return q
+
+    def after(self, value, id=None):
+        '''Return a new :class:`Query` for keyset pagination. Its elements
+are the ones which follow, in the query ordering, the element with *value*
+of the sorting field and primary key *id*. Unlike slicing with an offset,
+loading a page does not get slower as pages get deeper::
+
+    qs = session.query(Post).sort_by('-timestamp')
+    page = qs[:50]
+    last = page[-1]
+    next_page = qs.after(last.timestamp, last.id)[:50]
+
+The query must be sorted by the model :attr:`Metaclass.ordering` or by one of
+the :attr:`Metaclass.sort_indexes`. Slices of the new query are relative to
+the bound, while its :meth:`count` is not affected.
+
+:parameter value: the value of the sorting field at the bound.
+:parameter id: optional primary key of the element at the bound, which
+    breaks ties between elements with the same *value*. If not given, all
+    elements with *value* are excluded.
+:rtype: a new :class:`Query`.'''
+        return self._seek('after', value, id)
+
+    def before(self, value, id=None):
+        '''Same as :meth:`after` but the elements are the ones which precede
+the bound. They are still returned in the query ordering, so that
+``qs.before(value, id)[:50]`` is the page preceding the bound.'''
+        return self._seek('before', value, id)
+
+    def _seek(self, direction, value, id):
+        q = self._clone()
+        q.data['seek'] = (direction, value, id)
+        return q
         
     def search_queries(self, q):
         '''Return a new :class:`QueryElem` for *q* applying a text search.'''
@@ -585,6 +640,186 @@ list of ids deleted.'''
             session.delete(self)
         return t.deleted.get(self._meta)
 
+    def update(self, **kwargs):
+        '''Update the given fields of all elements matched by this
+:class:`Query` on the server, without loading them. Only scalar fields can be
+updated and only their indices are maintained. It returns the number of
+updated instances::
+
+    qs = session.query(MyModel).filter(group='a')
+    qs.update(flag=False)
+
+Instances already loaded in the :attr:`session` are not updated. If an
+instance violates a unique constraint it is left unchanged and a
+:class:`stdnet.CommitException` is raised once the other instances
+have been updated.'''
+        meta = self._meta
+        fields = {}
+        for name, value in iteritems(kwargs):
+            field = meta.dfields.get(name)
+            if field is None or field is meta.pk or\
+                    field not in meta.scalarfields:
+                raise QuerySetError('Cannot update field "{0}" of {1}.'\
+                                    .format(name, meta))
+            value = field.to_python(value)
+            svalue = field.serialize(value)
+            if isinstance(svalue, dict):
+                raise QuerySetError('Cannot update field "{0}" of {1}. It is '
+                                    'stored in more than one attribute.'\
+                                    .format(name, meta))
+            if (svalue is None or svalue == '') and field.required:
+                raise FieldValueError("Field '{0}' is required for '{1}'."\
+                                      .format(name, meta))
+            fields[field] = value
+        if not fields:
+            return 0
+        q = self.backend_query()
+        if isinstance(q, EmptyQuery):
+            return 0
+        return on_result(q.update(fields), self._updated)
+
+    def increment(self, field, by=1):
+        '''Increment the numeric *field* of all elements matched by this
+:class:`Query` by *by* on the server, without loading them. Unlike reading,
+adding and saving instances, concurrent increments are never lost::
+
+    qs = session.query(Product).filter(code='XA')
+    qs.increment('stock', -1)
+
+The indices of *field*, and the ordering of the model when sorted by *field*,
+are maintained. Instances already loaded in the :attr:`session` are not
+updated. If an instance violates a unique constraint it is left unchanged and
+a :class:`stdnet.CommitException` is raised once the other instances have
+been incremented.
+
+:parameter field: the name of an integer or float scalar field.
+:parameter by: the increment, an integer for integer fields.
+:rtype: a dictionary mapping the ids of the incremented elements to the new
+    values of *field*.'''
+        meta = self._meta
+        dfield = meta.dfields.get(field)
+        if dfield is None or dfield is meta.pk or\
+                dfield not in meta.scalarfields or\
+                dfield.python_type not in (int, float):
+            raise QuerySetError('Cannot increment field "{0}" of {1}.'\
+                                .format(field, meta))
+        if dfield.python_type is int and by != int(by):
+            raise QuerySetError('Cannot increment integer field "{0}" of {1} '
+                                'by {2}.'.format(field, meta, by))
+        q = self.backend_query()
+        if isinstance(q, EmptyQuery):
+            return {}
+        return on_result(q.increment(dfield, dfield.python_type(by)),
+                         self._updated)
+
+    def explain(self):
+        '''Return the execution plan of this :class:`Query` as a list of
+:class:`stdnet.backends.query_step`, one for each command the backend
+server runs to build and load the query. Each step reports the key it
+stores, the size of that key and the server time, in seconds, it took::
+
+    for step in session.query(MyModel).filter(group='a').explain():
+        print('%s %s %s' % (step.command, step.size, step.time))
+
+The plan is obtained by running a copy of the query, therefore this
+:class:`Query` is not executed.'''
+        q = self._clone().backend_query()
+        return [] if isinstance(q, EmptyQuery) else q.explain()
+
+    def summarize(self, *aggregates, **kwargs):
+        '''Compute *aggregates* of the elements matched by this :class:`Query`
+on the backend server, without loading them::
+
+    >>> qs = session.query(Order).filter(status='open')
+    >>> qs.summarize('count', 'amount__sum', 'amount__max')
+    {'count': 120, 'amount__sum': 2302.5, 'amount__max': 99.5}
+
+An aggregate is either ``count``, the number of elements, or the name of a
+numeric scalar field followed by a double underscore and a function.
+Available functions are ``count``, the number of elements with a value,
+``sum``, ``avg``, ``min`` and ``max``. Elements without a value are not
+aggregated, and ``avg``, ``min`` and ``max`` are ``None`` when no
+element has a value.
+
+:parameter aggregates: the aggregates to compute.
+:parameter group_by: optional name of a scalar field. If given, the aggregates
+    are computed for each value of the field and returned in a dictionary
+    keyed by the values::
+
+        >>> qs.summarize('amount__sum', group_by='currency')
+        {'EUR': {'amount__sum': 1200.0}, 'USD': {'amount__sum': 1102.5}}
+
+:rtype: a dictionary.'''
+        meta = self._meta
+        group_by = kwargs.pop('group_by', None)
+        if kwargs:
+            raise TypeError('summarize() got unexpected keyword arguments %s'\
+                            % ', '.join(kwargs))
+        fields, specs = [], []
+        for aggregate in aggregates:
+            if aggregate == 'count':
+                specs.append((aggregate, None, aggregate))
+                continue
+            bits = aggregate.split(JSPLITTER)
+            field = meta.dfields.get(JSPLITTER.join(bits[:-1]))
+            function = bits[-1]
+            if function not in aggregate_functions or field is None or\
+                    field not in meta.scalarfields or\
+                    field.internal_type != 'numeric' or\
+                    field.type == 'related object':
+                raise QuerySetError('Cannot aggregate "{0}" in {1}.'\
+                                    .format(aggregate, meta))
+            if field not in fields:
+                fields.append(field)
+            specs.append((aggregate, fields.index(field), function))
+        if group_by is not None:
+            field = meta.dfields.get(group_by)
+            if field is None or field not in meta.scalarfields:
+                raise QuerySetError('Cannot group by "{0}" in {1}.'\
+                                    .format(group_by, meta))
+            group_by = field
+        q = self.backend_query()
+        if isinstance(q, EmptyQuery):
+            groups = []
+        else:
+            groups = q.summarize(fields, group_by)
+        return on_result(groups, self._summarized, specs, fields, group_by)
+
+    def facets(self, *fields, **kwargs):
+        '''Count the elements matched by this :class:`Query` for each value
+of the indexed *fields*. Counts are evaluated on the backend server by
+intersecting the query with the index of each value, without loading the
+elements::
+
+    >>> qs = session.query(Instrument).filter(ccy='EUR')
+    >>> qs.facets('type', top=2)
+    {'type': [('equity', 320), ('bond', 97)]}
+
+:parameter fields: names of indexed fields which are not unique.
+:parameter top: optional maximum number of values to return for each field.
+:rtype: a dictionary mapping each field name to a list of ``(value, count)``
+    pairs sorted by decreasing count. Values are ``None`` for elements
+    without a value.'''
+        meta = self._meta
+        top = kwargs.pop('top', None)
+        if kwargs:
+            raise TypeError('facets() got unexpected keyword arguments %s'\
+                            % ', '.join(kwargs))
+        dfields = []
+        for name in fields:
+            field = meta.dfields.get(name)
+            if field is None or not field.index or field.unique or\
+                    field not in meta.scalarfields:
+                raise QuerySetError('Cannot facet on "{0}" in {1}. It is not '
+                                    'an index.'.format(name, meta))
+            dfields.append(field)
+        q = self.backend_query()
+        if isinstance(q, EmptyQuery):
+            counts = [[] for field in dfields]
+        else:
+            counts = q.facets(dfields, top)
+        return on_result(counts, self._faceted, dfields)
+
     def construct(self):
         '''Build the :class:`QueryElement` representing this query.'''
         if self.__construct is None:
@@ -750,7 +985,28 @@ of instances of models.'''
             return seq
         else:
             return on_result(self.backend_query().items(slic), self._items, key)
-        
+
+    def iterator(self, batch_size=100):
+        '''Generator over the instances matching this :class:`Query`. Unlike
+:meth:`items`, data is fetched from the server in batches of at most
+*batch_size* instances, so that large queries can be processed without
+loading them in memory in one go. Instances are not added to the
+:attr:`session` identity map and they are not cached. Available for
+synchronous backends only.
+
+:parameter batch_size: the maximum number of instances fetched from the
+    server in one call.
+'''
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+        q = self.backend_query()
+        if not isinstance(q, EmptyQuery):
+            session = self.session
+            for items in q.iterator(batch_size):
+                for instance in items:
+                    instance.session = session
+                    yield instance
+
     def _items(self, items, key):
         if isinstance(items, Exception):
             raise items
@@ -764,6 +1020,52 @@ of instances of models.'''
         self.cache()[key] = seq
         return seq
 
+    def _updated(self, count):
+        self.clear()
+        return count
+
+    def _faceted(self, counts, fields):
+        self.clear()
+        result = {}
+        for field, values in zip(fields, counts):
+            result[field.name] = [(field.to_python(v) if v else None, c)
+                                  for v, c in values]
+        return result
+
+    def _summarized(self, groups, specs, fields, group_by):
+        self.clear()
+        result = {}
+        if group_by is None and not groups:
+            groups = [(None, 0, ())]
+        for value, count, stats in groups:
+            summary = {}
+            for name, index, function in specs:
+                if index is None:
+                    summary[name] = count
+                    continue
+                field = fields[index]
+                if index < len(stats):
+                    n, total, min, max = stats[index]
+                else:
+                    n, total, min, max = 0, 0, None, None
+                if function == 'count':
+                    v = n
+                elif function == 'sum':
+                    v = total if field.python_type is float else int(total)
+                elif not n:
+                    v = None
+                elif function == 'avg':
+                    v = total/n
+                else:
+                    v = field.to_python(min if function == 'min' else max)
+                summary[name] = v
+            if group_by is None:
+                return summary
+            if value is not None:
+                value = group_by.to_python(value)
+            result[value] = summary
+        return result
+
     def _get(self, items):
         if items:
             if len(items) == 1:
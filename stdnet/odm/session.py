@@ -1,8 +1,9 @@
 import json
 from copy import copy
-from itertools import chain
+from itertools import chain, islice
+from functools import partial
 
-from stdnet import getdb
+from stdnet import getdb, on_result, BackendRequest
 from stdnet.utils import itervalues, zip
 from stdnet.utils.structures import OrderedDict
 from stdnet.exceptions import ModelNotRegistered, FieldValueError, \
@@ -285,6 +286,9 @@ Process results after a commit.
                                     modified=False,
                                     persistent=result.persistent)
                 instance.state().score = result.score
+                # the committed data, to find changed fields
+                dbdata = instance._dbdata
+                dbdata['loaded'] = dbdata.get('cleaned_data')
                 if instance.state().persistent:
                     instances.append(instance)
         return instances, deleted, errors
@@ -348,6 +352,22 @@ or using the ``with`` context manager::
 .. attribute:: logger
 
     Optional python logging object
+
+.. attribute:: max_commit_batch
+
+    Optional maximum number of instances of a model committed by a single
+    backend call. Large sessions are split into several calls so that other
+    clients are not blocked until the whole session is committed. If not
+    provided the backend ``max_commit_batch`` parameter is used.
+
+    default ``None``.
+
+.. attribute:: atomic
+
+    If ``True`` batches of a :attr:`max_commit_batch` session are committed
+    atomically. Each batch is always atomic.
+
+    default ``False``.
 '''
     default_name = 'transaction'
     commands = None
@@ -355,13 +375,16 @@ or using the ``with`` context manager::
 
     def __init__(self, session, name=None,
                  signal_commit=True, signal_delete=True,
-                 signal_session=True, logger=None):
+                 signal_session=True, logger=None,
+                 max_commit_batch=None, atomic=False):
         self.name = name or self.default_name
         self.session = session
         self.signal_commit = signal_commit
         self.signal_delete = signal_delete
         self.signal_session = signal_session
         self.logger = logger
+        self.max_commit_batch = max_commit_batch
+        self.atomic = atomic
         self.deleted = {}
         self.saved = {}
 
@@ -608,11 +631,21 @@ dictionary *kwargs* is of length 1 and has key given by ``id``) or from the
 server. If it the instance is not available, it tries to create one
 from the **kwargs** parameters.
 
+When the session is not in a :class:`Transaction` and *kwargs* are values
+of the primary key, of unique fields or of indexed fields, the backend
+server gets or creates the instance atomically in one call, if it can.
+In this case only the :ref:`post_commit <signal-api>` signal is sent, and
+only if the instance is created.
+
 :parameter model: a :class:`StdModel`
 :parameter kwargs: dictionary of parameters.
 :rtype: an instance of  two elements tuple containing the instance and a boolean
     indicating if the instance was created or not.
 '''
+        if self.transaction is None:
+            result = self._get_or_create(model, kwargs)
+            if result is not None:
+                return result
         try:
             res = self.query(model).get(**kwargs)
             created = False
@@ -621,6 +654,68 @@ from the **kwargs** parameters.
             created = True
         return res,created
 
+    def get_many(self, model, ids, load_only=None):
+        '''Load instances of *model* from a list of *ids* with one call to
+the backend server. Instances are added to the session.
+
+:parameter model: a :class:`StdModel`
+:parameter ids: iterable over primary keys.
+:parameter load_only: optional list of field names to load, as in
+    :meth:`Query.load_only`.
+:rtype: a list with the instances in the order of *ids* and ``None``
+    for ids which are not in the backend server.
+'''
+        ids = list(ids)
+        if not ids:
+            return []
+        items = self.backend.get_many(model._meta, ids, load_only)
+        return on_result(items, self._got_many)
+    
+    def _got_many(self, items):
+        for instance in items:
+            if instance is not None:
+                self.add(instance, modified=False)
+        return items
+
+    def _get_or_create(self, model, kwargs):
+        # get or create atomically in the backend server
+        meta = model._meta
+        pkname = meta.pkname()
+        if not kwargs or (pkname in kwargs and len(kwargs) == 1 and\
+                          self.get(model, kwargs[pkname]) is not None):
+            return
+        attnames = []
+        for name in kwargs:
+            if name == pkname:
+                attnames.append(pkname)
+            elif name in meta.dfields and meta.dfields[name] in meta.indices:
+                attnames.append(meta.dfields[name].attname)
+            else:
+                return
+        instance = model(**kwargs)
+        if not meta.is_valid(instance):
+            return
+        data = instance._dbdata['cleaned_data']
+        lookups = [(name, instance.pkvalue() if name == pkname else\
+                    data.get(name)) for name in attnames]
+        if None in (value for _, value in lookups):
+            return
+        result = self.backend.get_or_create(meta, instance, lookups)
+        if result is not None:
+            return on_result(result, self._got_or_create, model)
+    
+    def _got_or_create(self, result, model):
+        instance, created = result
+        if created:
+            instance.session = self
+            instance = self.model(instance._meta).add(instance, modified=False,
+                                                      persistent=True)
+            post_commit.send(model, instances=[instance], session=self,
+                             transaction=None)
+        else:
+            instance = self.add(instance, modified=False)
+        return instance, created
+
     def get(self, model, id):
         sm = self._models.get(model._meta)
         if sm:
@@ -773,6 +868,16 @@ if their managers have the same backend database.'''
     def get(self, **kwargs):
         return self.query().get(**kwargs)
 
+    def get_many(self, ids, load_only=None):
+        '''Load instances of :attr:`model` from a list of *ids*. Unlike
+``filter(id__in=ids)``, no query is built on the server: the instances are
+loaded directly with one call to the backend. Check :meth:`Session.get_many`
+for details.
+
+:rtype: a list with the instances in the order of *ids* and ``None``
+    for ids which are not in the backend server.'''
+        return self.session().get_many(self.model, ids, load_only)
+
     def flush(self):
         return self.session().flush(self.model)
 
@@ -783,11 +888,81 @@ if their managers have the same backend database.'''
         return self.session().keys(self.model)
 
     def get_or_create(self, **kwargs):
+        '''Get an instance of :attr:`model` or create it. Check
+:meth:`Session.get_or_create` for details.'''
         session = self.session()
+        result = session._get_or_create(self.model, kwargs)
+        if result is not None:
+            return result
         with session.begin():
             el,created = session.get_or_create(self.model, **kwargs)
         return el,created
 
+    def bulk_create(self, rows, batch_size=1000, fields=None, session=False):
+        '''Create new instances of :attr:`model` from an iterable over *rows*.
+Rows are validated and committed in batches of *batch_size* elements, each
+batch with one call to the backend server. Unless *session* is ``True``,
+no :class:`Session` is involved, therefore commit signals are not sent.
+
+:parameter rows: iterable over dictionaries or tuples of field values.
+:parameter batch_size: maximum number of instances validated and committed
+    in one go.
+:parameter fields: names of fields for tuple rows. By default the
+    scalar fields of :attr:`model` (excluding an automatic primary key)
+    in their declaration order.
+:parameter session: if ``True`` each batch is committed with a
+    :class:`Transaction` as for :meth:`Session.add`. Default ``False``.
+:rtype: a list of ids of the new instances.
+
+If an instance fails validation a :class:`stdnet.FieldValueError` is raised
+before its batch is committed. If instances violate a unique constraint a
+:class:`stdnet.CommitException` is raised once their batch is committed, with
+the number of rows which could not be created in its ``failures`` attribute.
+The other instances of the batch are created. Committed batches are not rolled
+back.'''
+        if batch_size < 1:
+            raise ValueError('batch_size must be a positive integer')
+        if fields is None:
+            fields = tuple((f.name for f in self.model._meta.scalarfields\
+                            if f.type != 'auto'))
+        return self._bulk_create(iter(rows), batch_size, fields, session, [])
+    
+    def _bulk_create(self, rows, batch_size, fields, session, ids, new=()):
+        # Commit the remaining rows in batches. With an asynchronous backend
+        # the next batch is committed once the backend has replied.
+        model = self.model
+        meta = model._meta
+        backend = self.session().backend
+        ids.extend(new)
+        while True:
+            instances = []
+            for row in islice(rows, batch_size):
+                if not isinstance(row, dict):
+                    row = dict(zip(fields, row))
+                instance = model(**row)
+                if not meta.is_valid(instance):
+                    raise FieldValueError(
+                                json.dumps(instance._dbdata['errors']))
+                instances.append(instance)
+            if not instances:
+                return ids
+            if session:
+                with self.transaction() as t:
+                    for instance in instances:
+                        t.add(instance)
+                if t.pending:
+                    new = t.pending.add_callback(lambda r: [instance.pkvalue()\
+                                                    for instance in instances])
+                else:
+                    new = [instance.pkvalue() for instance in instances]
+            else:
+                new = backend.bulk_create(meta, instances)
+            if isinstance(new, BackendRequest):
+                return new.add_callback(partial(self._bulk_create, rows,
+                                                batch_size, fields, session,
+                                                ids))
+            ids.extend(new)
+
     def __copy__(self):
         cls = self.__class__
         obj = cls.__new__(cls)
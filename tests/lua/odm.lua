@@ -95,4 +95,75 @@ suite.test_query = function ()
     assert_equal(r, 0)
 end
 
+suite.test_range_index = function ()
+    odm.redis.call('flushdb')
+    local model = odm.model({namespace='test:numeric',
+                             id_name='id',
+                             id_type=1,
+                             indices={pv=false},
+                             ranges={'pv'}})
+    commit_data(model, {{action='add', data={pv='3'}},
+                        {action='add', data={pv='-2'}},
+                        {action='add', data={pv='7.5'}}})
+    assert_equal(3, redis.call('zcard', model:range_key('pv')))
+    local r = model:query(model:temp_key(), 'pv', {'gt', '-2', 'le', '7.5'})
+    assert_equal(r, 2)
+    r = model:query(model:temp_key(), 'pv', {'value', '3', 'lt', '5'})
+    assert_equal(r, 1)
+    r = model:query(model:temp_key(), 'pv', {'ge', '3', 'gt', '3'})
+    assert_equal(r, 1)
+    -- instances missing from the index are found with a scan
+    redis.call('zrem', model:range_key('pv'), 1)
+    r = model:query(model:temp_key(), 'pv', {'gt', '-2', 'le', '7.5'})
+    assert_equal(r, 2)
+end
+
+suite.test_prefix_index = function ()
+    odm.redis.call('flushdb')
+    local model = odm.model({namespace='test:prefix',
+                             id_name='id',
+                             id_type=1,
+                             indices={},
+                             prefixes={'name'}})
+    commit_data(model, {{action='add', data={name='foobar'}},
+                        {action='add', data={name='foo'}},
+                        {action='add', data={name='barfoo'}}})
+    assert_equal(3, redis.call('zcard', model:lex_key('name')))
+    assert_equal(3, redis.call('zcard', model:lex_key('name', true)))
+    local r = model:query(model:temp_key(), 'name', {'startswith', 'foo'})
+    assert_equal(r, 2)
+    r = model:query(model:temp_key(), 'name', {'endswith', 'foo'})
+    assert_equal(r, 2)
+    r = model:query(model:temp_key(), 'name', {'startswith', 'foo',
+                                               'endswith', 'bar'})
+    assert_equal(r, 1)
+    -- instances missing from the index are found with a scan
+    redis.call('del', model:lex_key('name'), model:lex_key('name', true))
+    r = model:query(model:temp_key(), 'name', {'startswith', 'foo'})
+    assert_equal(r, 2)
+end
+
+suite.test_intersect = function ()
+    odm.redis.call('flushdb')
+    local model = odm.model({namespace='test:intersect',
+                             id_name='id',
+                             id_type=1,
+                             indices={group=false},
+                             ranges={'pv'}})
+    commit_data(model, {{action='add', data={group='a', pv='1'}},
+                        {action='add', data={group='b', pv='2'}},
+                        {action='add', data={group='a', pv='3'}},
+                        {action='add', data={group='b', pv='4'}}})
+    local key = model:temp_key()
+    local r = model:intersect(key, {key}, {{field='pv', queries={'gt', '1'}},
+                                           {field='group',
+                                            queries={'value', 'a'}}})
+    assert_equal(r, 1)
+    r = model:intersect(key, {key}, {{field='pv', queries={'gt', '1'}},
+                                     {field='group',
+                                      queries={'value', 'c'}}})
+    assert_equal(r, 0)
+    assert_equal(0, redis.call('exists', key))
+end
+
 return suite
@@ -0,0 +1,132 @@
+'''Asynchronous asyncio connection'''
+import sys
+try:
+    import asyncio
+except ImportError:     #pragma    nocover
+    asyncio = None
+
+from stdnet import BackendRequest, getdb, odm
+from stdnet.utils import test
+
+from examples.models import SimpleModel
+
+if sys.version_info < (3, 5):    #pragma    nocover
+    asyncio = None
+else:
+    from stdnet.lib.redis.aio import RedisConnection
+
+
+@test.skipUnless(asyncio, 'Requires python 3.5 or 3.6')
+class TestAsyncio(test.CleanTestCase):
+    multipledb = 'redis'
+    model = SimpleModel
+    
+    def setUp(self):
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.abackend = getdb(self.backend.connection_string,
+                              connection_class=RedisConnection)
+        
+    def tearDown(self):
+        self.abackend.disconnect()
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        
+    def wait(self, result):
+        return self.loop.run_until_complete(result)
+    
+    def testMeta(self):
+        client = self.abackend.client
+        self.assertEqual(client.connection_pool.connection_class,
+                         RedisConnection)
+        
+    def testSimple(self):
+        client = self.abackend.client
+        request = client.ping()
+        self.assertTrue(isinstance(request, BackendRequest))
+        self.assertEqual(request.command_name, 'PING')
+        self.assertEqual(self.wait(request), True)
+        self.assertEqual(request.result, True)
+        self.assertEqual(self.wait(client.echo('ciao')), b'ciao')
+        
+    def testConcurrent(self):
+        client = self.abackend.client.prefixed(self.namespace)
+        requests = [client.incr('counter') for _ in range(20)]
+        results = [self.wait(request) for request in requests]
+        self.assertEqual(sorted(results), list(range(1, 21)))
+        
+    def testPipeline(self):
+        client = self.abackend.client.prefixed(self.namespace)
+        for transaction in (True, False):
+            pipe = client.pipeline(transaction=transaction)
+            pipe.set('a', 'foo').get('a')
+            self.assertEqual(self.wait(pipe.execute()), [True, b'foo'])
+            
+    def testCallbacks(self):
+        client = self.abackend.client
+        request = client.echo('ciao').add_callback(lambda r: r + b'!')
+        self.assertEqual(self.wait(request), b'ciao!')
+        request = client.echo('ciao').add_callback(
+                                        lambda r: client.echo(r + b'?'))
+        self.assertEqual(self.wait(request), b'ciao?')
+        
+    def testOdm(self):
+        session = odm.Session(self.abackend)
+        with session.begin() as t:
+            t.add(SimpleModel(code='pluto', group='planet'))
+            t.add(SimpleModel(code='venus', group='planet'))
+        self.assertTrue(t.pending)
+        self.assertEqual(self.wait(t.pending), t)
+        self.assertEqual(len(t.saved[SimpleModel._meta]), 2)
+        query = session.query(SimpleModel)
+        self.assertEqual(self.wait(query.count()), 2)
+        items = self.wait(query.all())
+        self.assertEqual(set(m.code for m in items), set(('pluto', 'venus')))
+        
+    def testStructure(self):
+        session = odm.Session(self.abackend)
+        with session.begin() as t:
+            z = t.add(odm.Zset())
+            z.add(1, 'earth')
+            z.add(0.06, 'mercury')
+        self.wait(t.pending)
+        self.assertEqual(self.wait(z.size()), 2)
+        result = self.wait(z.irange())
+        self.assertEqual(list(result), [(0.06, 'mercury'), (1, 'earth')])
+        
+    def testGetOrCreate(self):
+        session = odm.Session(self.abackend)
+        request = session.get_or_create(SimpleModel, code='venus')
+        self.assertTrue(isinstance(request, BackendRequest))
+        venus, created = self.wait(request)
+        self.assertTrue(created)
+        self.assertEqual(venus.code, 'venus')
+        self.assertTrue(venus.state().persistent)
+        self.assertTrue(venus in session)
+        venus2, created = self.wait(session.get_or_create(SimpleModel,
+                                                          code='venus'))
+        self.assertFalse(created)
+        self.assertEqual(venus2.id, venus.id)
+        
+    def testGetMany(self):
+        session = odm.Session(self.abackend)
+        with session.begin() as t:
+            t.add(SimpleModel(code='pluto'))
+            t.add(SimpleModel(code='venus'))
+        self.wait(t.pending)
+        ids = [m.id for m in t.saved[SimpleModel._meta]]
+        session = odm.Session(self.abackend)
+        items = self.wait(session.get_many(SimpleModel, ids))
+        self.assertEqual(set(m.code for m in items), set(('pluto', 'venus')))
+        self.assertTrue(all(m in session for m in items))
+        
+    def testMaterialize(self):
+        session = odm.Session(self.abackend)
+        with session.begin() as t:
+            t.add(SimpleModel(code='pluto', group='planet'))
+            t.add(SimpleModel(code='sun', group='star'))
+        self.wait(t.pending)
+        query = session.query(SimpleModel).filter(group='planet')
+        self.assertEqual(self.wait(query.materialize().count()), 1)
+        items = self.wait(query.materialize().all())
+        self.assertEqual([m.code for m in items], ['pluto'])
@@ -0,0 +1,88 @@
+'''Compound indexes declared with the indexes Meta attribute.'''
+from stdnet import odm, ImproperlyConfigured
+from stdnet.utils import test, populate, zip
+
+from examples.models import Customer
+
+SIZE = 100
+
+countries = populate('choice', SIZE, choice_from=['it', 'uk', 'us', 'fr'])
+statuses = populate('choice', SIZE, choice_from=['open', 'closed', 'new'])
+
+
+class TestCompoundIndex(test.CleanTestCase):
+    multipledb = 'redis'
+    model = Customer
+    
+    def setUp(self):
+        session = self.session()
+        with session.begin():
+            for n, (c, s) in enumerate(zip(countries, statuses)):
+                session.add(self.model(name='c%s' % n, country=c, status=s))
+        
+    def check(self, country, status):
+        qs = self.session().query(self.model)
+        expected = set((o.id for o in qs if o.country == country and\
+                        o.status == status))
+        result = qs.filter(country=country, status=status)
+        self.assertEqual(set((o.id for o in result)), expected)
+        return result
+    
+    def testMeta(self):
+        meta = self.model._meta
+        self.assertEqual(meta.indexes, (('country', 'status'),))
+        self.assertEqual(meta.as_dict()['compound_indices'],
+                         [['country', 'status']])
+        
+    def testBadIndex(self):
+        def bad_class(names):
+            class MyBadClass(odm.StdModel):
+                name = odm.SymbolField(unique=True)
+                code = odm.SymbolField()
+                description = odm.CharField()
+                class Meta:
+                    indexes = [names]
+        self.assertRaises(ImproperlyConfigured, bad_class, ('code',))
+        self.assertRaises(ImproperlyConfigured, bad_class, ('code', 'foo'))
+        self.assertRaises(ImproperlyConfigured, bad_class, ('code', 'name'))
+        self.assertRaises(ImproperlyConfigured, bad_class,
+                          ('code', 'description'))
+        
+    def testFilter(self):
+        for country in ('it', 'uk', 'us', 'fr'):
+            for status in ('open', 'closed', 'new'):
+                self.check(country, status)
+        self.assertEqual(self.check('it', 'whatever').count(), 0)
+        
+    def testIndexKeys(self):
+        backend = self.session().backend
+        meta = self.model._meta
+        qs = self.session().query(self.model)
+        key = backend.basekey(meta, 'cdx', 'country,status')
+        self.assertEqual(int(backend.client.get(key)), qs.count())
+        for o in qs:
+            ckey = '%s:%s\0%s' % (key, o.country, o.status)
+            self.assertTrue(backend.client.sismember(ckey, o.id))
+        
+    def testChange(self):
+        session = self.session()
+        qs = session.query(self.model)
+        with session.begin():
+            for o in qs.filter(country='it', status='open'):
+                o.status = 'closed'
+                session.add(o)
+        self.assertEqual(self.check('it', 'open').count(), 0)
+        self.check('it', 'closed')
+        qs.filter(country='uk').update(status='open')
+        self.check('uk', 'open')
+        self.assertEqual(self.check('uk', 'new').count(), 0)
+        qs.filter(country='us').delete()
+        self.assertEqual(self.check('us', 'new').count(), 0)
+        self.check('fr', 'new')
+        
+    def testIncompleteIndex(self):
+        backend = self.session().backend
+        meta = self.model._meta
+        backend.client.delete(backend.basekey(meta, 'cdx', 'country,status'))
+        self.check('it', 'open')
+        self.check('fr', 'closed')
@@ -0,0 +1,23 @@
+'''Plans of queries with Query.explain.'''
+from examples.models import NumericIndexData
+
+from .ranges import NumericTest
+
+
+class TestExplain(NumericTest):
+    multipledb = 'redis'
+    model = NumericIndexData
+    models = (NumericIndexData,)
+    
+    def testExplain(self):
+        session = self.session()
+        qs = session.query(self.model).filter(pv__gt=-1, vega__lt=0)
+        steps = qs.explain()
+        self.assertFalse(qs.executed)
+        commands = [step.command for step in steps]
+        self.assertEqual(commands[0], 'odmrun.intersect')
+        self.assertEqual(commands[-1], 'odmrun.load')
+        self.assertEqual(steps[0].size, qs.count())
+        self.assertEqual(steps[-1].size, qs.count())
+        for step in steps:
+            self.assertTrue(step.time >= 0)
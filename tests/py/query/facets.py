@@ -0,0 +1,100 @@
+'''Facet counts of indexed fields with Query.facets.'''
+from stdnet import QuerySetError
+from stdnet.utils import test, to_string
+
+from examples.models import Instrument, Position
+from examples.data import FinanceTest
+
+
+def counts(values):
+    result = {}
+    for value in values:
+        result[value] = result.get(value, 0) + 1
+    return result
+
+
+class TestFacets(FinanceTest):
+    multipledb = 'redis'
+    model = Instrument
+    
+    def setUp(self):
+        self.data.create(self)
+        
+    def testAll(self):
+        qs = self.session().query(self.model)
+        facets = qs.facets('type', 'ccy')
+        instruments = qs.all()
+        self.assertEqual(dict(facets['type']),
+                         counts((i.type for i in instruments)))
+        self.assertEqual(dict(facets['ccy']),
+                         counts((i.ccy for i in instruments)))
+        values = [c for v, c in facets['type']]
+        self.assertEqual(values, sorted(values, reverse=True))
+        
+    def testFilter(self):
+        qs = self.session().query(self.model).filter(ccy=('EUR', 'USD'))
+        facets = qs.facets('type', 'ccy')
+        instruments = qs.all()
+        self.assertEqual(dict(facets['type']),
+                         counts((i.type for i in instruments)))
+        self.assertEqual(dict(facets['ccy']),
+                         counts((i.ccy for i in instruments)))
+        
+    def testTop(self):
+        qs = self.session().query(self.model)
+        facets = qs.facets('type', top=2)
+        self.assertEqual(len(facets['type']), 2)
+        self.assertEqual(facets['type'], qs.facets('type')['type'][:2])
+        
+    def testEmpty(self):
+        qs = self.session().query(self.model).filter(ccy='XXX')
+        self.assertEqual(qs.facets('type'), {'type': []})
+        
+    def testValues(self):
+        # the values of an indexed field are kept in a set for facets
+        session = self.session()
+        qs = session.query(self.model)
+        backend = session.backend
+        key = backend.basekey(self.model._meta, 'idv', 'ccy')
+        values = lambda: set((to_string(v) for v in\
+                              backend.client.smembers(key)))
+        ccys = set((i.ccy for i in qs))
+        self.assertEqual(values(), ccys)
+        ccy = ccys.pop()
+        qs.filter(ccy=ccy).delete()
+        self.assertEqual(values(), ccys)
+        facets = session.query(self.model).facets('ccy')
+        self.assertFalse(ccy in dict(facets['ccy']))
+        
+    def testMissingValues(self):
+        # the set of values is rebuilt for instances saved before it was
+        # available
+        session = self.session()
+        qs = session.query(self.model)
+        backend = session.backend
+        key = backend.basekey(self.model._meta, 'idv', 'ccy')
+        backend.client.delete(key)
+        facets = qs.facets('ccy')
+        self.assertEqual(dict(facets['ccy']), counts((i.ccy for i in qs)))
+        self.assertEqual(set((to_string(v) for v in\
+                              backend.client.smembers(key))),
+                         set((i.ccy for i in qs)))
+        
+    def testErrors(self):
+        qs = self.session().query(self.model)
+        self.assertRaises(QuerySetError, qs.facets, 'name')
+        self.assertRaises(QuerySetError, qs.facets, 'description')
+        self.assertRaises(QuerySetError, qs.facets, 'foo')
+        self.assertRaises(TypeError, qs.facets, 'type', bottom=2)
+        
+        
+class TestForeignKeyFacets(FinanceTest):
+    multipledb = 'redis'
+    model = Position
+    
+    def testForeignKey(self):
+        session = self.data.makePositions(self)
+        qs = session.query(self.model)
+        facets = qs.facets('fund')
+        self.assertEqual(dict(facets['fund']),
+                         counts((p.fund_id for p in qs)))
@@ -0,0 +1,91 @@
+'''Atomic increments of numeric fields with Query.increment.'''
+from stdnet import QuerySetError, CommitException
+from stdnet.utils import test
+
+from examples.models import Page, NumericIndexData, SortedPerson, Group
+
+
+class TestIncrement(test.CleanTestCase):
+    multipledb = 'redis'
+    models = (Page, NumericIndexData, SortedPerson, Group)
+    
+    def setUp(self):
+        self.register()
+        
+    def testInteger(self):
+        session = self.session()
+        with session.begin():
+            for n in range(3):
+                session.add(Page(in_navigation=n))
+        qs = session.query(Page).filter(in_navigation=(1, 2))
+        values = qs.increment('in_navigation', 10)
+        self.assertEqual(len(values), 2)
+        self.assertEqual(sorted(values.values()), [11, 12])
+        qs = self.session().query(Page)
+        self.assertEqual(sorted((p.in_navigation for p in qs)), [0, 11, 12])
+        self.assertEqual(qs.filter(in_navigation=12).count(), 1)
+        self.assertEqual(qs.filter(in_navigation=2).count(), 0)
+        
+    def testFloat(self):
+        session = self.session()
+        with session.begin():
+            for pv in (1.5, 2.5, 3.5):
+                session.add(NumericIndexData(pv=pv))
+        qs = session.query(NumericIndexData)
+        values = qs.increment('pv', 0.25)
+        self.assertEqual(sorted(values.values()), [1.75, 2.75, 3.75])
+        self.assertEqual(qs.filter(pv__gt=2.6).count(), 2)
+        self.assertEqual(qs.filter(pv__le=1.75).count(), 1)
+        
+    def testInstance(self):
+        page = Page(in_navigation=1).save()
+        self.assertEqual(page.increment('in_navigation'), 2)
+        self.assertEqual(page.in_navigation, 2)
+        self.assertEqual(page.increment('in_navigation', -5), -3)
+        page = self.session().query(Page).get(id=page.id)
+        self.assertEqual(page.in_navigation, -3)
+        self.assertRaises(ValueError, Page().increment, 'in_navigation')
+        
+    def testConcurrentInstance(self):
+        page = Page(in_navigation=1).save()
+        page = self.session().query(Page).get(id=page.id)
+        other = self.session().query(Page).get(id=page.id)
+        self.assertEqual(page.increment('in_navigation'), 2)
+        self.assertEqual(other.increment('in_navigation', 3), 5)
+        # saving does not write back the incremented field
+        page.save()
+        page = self.session().query(Page).get(id=page.id)
+        self.assertEqual(page.in_navigation, 5)
+        
+    def testNotNumeric(self):
+        session = self.session()
+        with session.begin():
+            p1 = session.add(Page(in_navigation=1))
+            p2 = session.add(Page(in_navigation=2))
+        backend = session.backend
+        key = backend.basekey(Page._meta, 'obj', p1.id)
+        backend.client.hset(key, 'in_navigation', 'foo')
+        qs = session.query(Page)
+        self.assertRaises(CommitException, qs.increment, 'in_navigation')
+        # the indices of the invalid instance are untouched
+        self.assertEqual(qs.filter(in_navigation=1).count(), 1)
+        self.assertEqual(qs.filter(in_navigation=3).count(), 1)
+        
+    def testSortIndex(self):
+        session = self.session()
+        group = session.add(Group(name='a'))
+        with session.begin():
+            for name, age in (('x', 10), ('y', 20), ('z', 30)):
+                session.add(SortedPerson(name=name, age=age, group=group))
+        qs = session.query(SortedPerson)
+        qs.filter(name='x').increment('age', 25)
+        names = [p.name for p in self.session().query(SortedPerson)\
+                 .sort_by('age')]
+        self.assertEqual(names, ['y', 'x', 'z'])
+        
+    def testErrors(self):
+        qs = self.session().query(Page)
+        self.assertRaises(QuerySetError, qs.increment, 'id')
+        self.assertRaises(QuerySetError, qs.increment, 'foo')
+        self.assertRaises(QuerySetError, qs.increment, 'in_navigation', 0.5)
+        self.assertEqual(qs.increment('in_navigation'), {})
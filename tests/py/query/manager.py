@@ -1,6 +1,7 @@
 import random
 
 import stdnet
+from stdnet import odm
 from stdnet.utils import test, populate
 
 from examples.models import SimpleModel
@@ -34,6 +35,38 @@ class TestManager(test.CleanTestCase):
         v1 = SimpleModel.objects.get(code = 'test')
         self.assertEqual(v1,v)
         
+    def testGetOrCreateAtomic(self):
+        v, created = SimpleModel.objects.get_or_create(code='test', group='g1')
+        self.assertTrue(created)
+        self.assertTrue(v.id)
+        self.assertTrue(v.state().persistent)
+        self.assertEqual(SimpleModel.objects.get(code='test'), v)
+        v2, created = SimpleModel.objects.get_or_create(id=v.id, group='g1')
+        self.assertFalse(created)
+        self.assertEqual(v2, v)
+        self.assertEqual(v2.code, 'test')
+        self.assertEqual(v2.group, 'g1')
+        
+    def testGetOrCreateAtomicConflict(self):
+        SimpleModel.objects.get_or_create(code='test', group='g1')
+        self.assertRaises(stdnet.CommitException,
+                          SimpleModel.objects.get_or_create,
+                          code='test', group='g2')
+        self.assertEqual(SimpleModel.objects.query().count(), 1)
+        
+    def testGetOrCreateSignal(self):
+        created = []
+        def callback(instances, **kwargs):
+            created.extend(instances)
+        odm.post_commit.connect(callback, sender=SimpleModel)
+        try:
+            SimpleModel.objects.get_or_create(code='test')
+            SimpleModel.objects.get_or_create(code='test')
+        finally:
+            odm.post_commit.disconnect(callback, sender=SimpleModel)
+        self.assertEqual(len(created), 1)
+        self.assertEqual(created[0].code, 'test')
+        
     def testGetError(self):
         '''Test for a ObjectNotFound exception.'''
         self.assertRaises(SimpleModel.DoesNotExist,
@@ -80,4 +113,99 @@ class TestManager(test.CleanTestCase):
         self.assertTrue(1 in qs)
         self.assertEqual(qs.cache(),{})
         
+    def testBulkCreate(self):
+        rows = [{'code': name, 'group': 'g1'} for name in names[:50]]
+        rows.extend(((name, 'g2') for name in names[50:]))
+        ids = SimpleModel.objects.bulk_create(rows, batch_size=30,
+                                              fields=('code', 'group'))
+        self.assertEqual(len(ids), LEN)
+        self.assertEqual(SimpleModel.objects.query().count(), LEN)
+        self.assertEqual(SimpleModel.objects.filter(group='g2').count(), 50)
+        v = SimpleModel.objects.get(code=names[60])
+        self.assertEqual(v.id, ids[60])
+        self.assertEqual(v.group, 'g2')
+        
+    def testBulkCreateSession(self):
+        rows = ({'code': name} for name in names)
+        ids = SimpleModel.objects.bulk_create(rows, batch_size=40,
+                                              session=True)
+        self.assertEqual(len(ids), LEN)
+        self.assertEqual(SimpleModel.objects.filter(id=ids).count(), LEN)
+        
+    def testBulkCreateErrors(self):
+        self.assertRaises(stdnet.FieldValueError,
+                          SimpleModel.objects.bulk_create, [{'group': 'g1'}])
+        self.assertRaises(stdnet.CommitException,
+                          SimpleModel.objects.bulk_create,
+                          [{'code': 'a'}, {'code': 'a'}])
+        
+    def testBulkCreateUniqueErrors(self):
+        # rows of a batch which do not violate the unique constraint are
+        # created
+        rows = [{'code': 'a'}, {'code': 'b'}, {'code': 'a'}, {'code': 'c'},
+                {'code': 'b'}]
+        try:
+            SimpleModel.objects.bulk_create(rows, batch_size=10)
+        except stdnet.CommitException as e:
+            self.assertEqual(e.failures, 2)
+        else:
+            raise AssertionError('CommitException not raised')
+        qs = SimpleModel.objects.query()
+        self.assertEqual(set((m.code for m in qs)), set(('a', 'b', 'c')))
+        
+    def testUpdate(self):
+        self.fill()
+        qs = SimpleModel.objects.filter(code=names[:10])
+        self.assertEqual(qs.update(group='g1', description='updated'), 10)
+        qs = SimpleModel.objects.filter(group='g1')
+        self.assertEqual(qs.count(), 10)
+        for v in qs:
+            self.assertEqual(v.description, 'updated')
+        self.assertEqual(qs.update(group=None), 10)
+        self.assertEqual(SimpleModel.objects.filter(group='g1').count(), 0)
+        self.assertEqual(SimpleModel.objects.query().count(), LEN)
+        
+    def testUpdateUnique(self):
+        self.fill()
+        qs = SimpleModel.objects.filter(code=names[:3])
+        self.assertRaises(stdnet.CommitException, qs.update, code='same')
+        self.assertEqual(SimpleModel.objects.filter(code='same').count(), 1)
+        self.assertEqual(SimpleModel.objects.filter(code=names[:3]).count(), 2)
+        
+    def testUpdateErrors(self):
+        qs = SimpleModel.objects.query()
+        self.assertRaises(stdnet.QuerySetError, qs.update, id=5)
+        self.assertRaises(stdnet.QuerySetError, qs.update, foo=5)
+        self.assertRaises(stdnet.FieldValueError, qs.update, code=None)
+
+    def testGetMany(self):
+        self.fill()
+        qs = SimpleModel.objects.filter(code=names[:5])
+        ids = [v.id for v in qs]
+        ids.reverse()
+        items = SimpleModel.objects.get_many(ids)
+        self.assertEqual([v.id for v in items], ids)
+        for v in items:
+            self.assertEqual(v, SimpleModel.objects.get(id=v.id))
+            self.assertTrue(v.session)
+        self.assertEqual(SimpleModel.objects.get_many([]), [])
         
+    def testGetManyMissing(self):
+        self.fill()
+        v = SimpleModel.objects.get(code=names[0])
+        items = SimpleModel.objects.get_many([v.id, 5000, v.id])
+        self.assertEqual(len(items), 3)
+        self.assertEqual(items[0], v)
+        self.assertEqual(items[1], None)
+        self.assertEqual(items[2], v)
+        
+    def testGetManyLoadOnly(self):
+        self.fill()
+        v = SimpleModel.objects.get(code=names[0])
+        items = SimpleModel.objects.get_many([5000, v.id], load_only=('code',))
+        self.assertEqual(items[0], None)
+        self.assertEqual(items[1].code, names[0])
+        self.assertFalse(hasattr(items[1], 'group'))
+        items = SimpleModel.objects.get_many([v.id, 5000], load_only=('id',))
+        self.assertEqual(items[0].id, v.id)
+        self.assertEqual(items[1], None)
@@ -0,0 +1,31 @@
+'''Reusable query results with Query.materialize.'''
+from examples.models import NumericIndexData
+
+from .ranges import NumericTest
+
+
+class TestMaterialize(NumericTest):
+    multipledb = 'redis'
+    model = NumericIndexData
+    models = (NumericIndexData,)
+    
+    def testMaterialize(self):
+        session = self.session()
+        query = session.query(self.model)
+        qs = query.filter(pv__gt=-1).materialize(30)
+        ids = set((v.id for v in qs))
+        self.assertEqual(ids, set((v.id for v in query.filter(pv__gt=-1))))
+        key = qs.backend_query().query_key
+        # identical queries share the materialized result
+        qs = query.filter(pv__gt=-1).materialize(30)
+        self.assertEqual(qs.backend_query().query_key, key)
+        self.assertEqual(qs.count(), len(ids))
+        # a commit invalidates it
+        with session.begin():
+            session.add(self.model(pv=100, data={'test': {'': 0, 'inner': 0}}))
+        qs = query.filter(pv__gt=-1).materialize(30)
+        self.assertNotEqual(qs.backend_query().query_key, key)
+        self.assertEqual(qs.count(), len(ids) + 1)
+        query.filter(pv__gt=99).delete()
+        qs = query.filter(pv__gt=-1).materialize(30)
+        self.assertEqual(qs.count(), len(ids))
@@ -0,0 +1,72 @@
+from stdnet.utils import test
+
+from examples.models import PrefixData
+
+
+class TestPrefixIndex(test.TestCase):
+    multipledb = 'redis'
+    model = PrefixData
+    names = ('foo', 'foobar', 'barfoo', 'bar', 'foofoo', 'xfoox')
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPrefixIndex, cls).setUpClass()
+        cls.register()
+        yield cls.clear_all()
+        session = cls.session()
+        with session.begin() as t:
+            for name in cls.names:
+                t.add(cls.model(name=name, description=name.upper()))
+
+    @classmethod
+    def tearDownClass(cls):
+        yield cls.clear_all()
+
+    def testIndexKeys(self):
+        backend = self.backend
+        client = backend.client
+        for f in ('lex', 'xel'):
+            key = backend.basekey(self.model._meta, f, 'name')
+            self.assertEqual(client.zcard(key), len(self.names))
+
+    def testStartswith(self):
+        query = self.session().query(self.model)
+        qs = query.filter(name__startswith='foo')
+        self.assertEqual(set((m.name for m in qs)),
+                         set(('foo', 'foobar', 'foofoo')))
+        qs = query.filter(description__startswith='BAR')
+        self.assertEqual(set((m.name for m in qs)), set(('barfoo', 'bar')))
+
+    def testEndswith(self):
+        query = self.session().query(self.model)
+        qs = query.filter(name__endswith='foo')
+        self.assertEqual(set((m.name for m in qs)),
+                         set(('foo', 'barfoo', 'foofoo')))
+
+    def testCombined(self):
+        query = self.session().query(self.model)
+        qs = query.filter(name__startswith='foo', name__endswith='bar')
+        self.assertEqual([m.name for m in qs], ['foobar'])
+        qs = query.filter(name__startswith='foo').exclude(name__endswith='foo')
+        self.assertEqual([m.name for m in qs], ['foobar'])
+
+    def testNoMatch(self):
+        query = self.session().query(self.model)
+        self.assertFalse(query.filter(name__startswith='z').count())
+
+    def testIncompleteIndex(self):
+        # instances saved before the index was available are found by
+        # scanning the model and added to the index when saved again
+        backend = self.backend
+        client = backend.client
+        keys = [backend.basekey(self.model._meta, f, 'name')
+                for f in ('lex', 'xel')]
+        client.delete(*keys)
+        query = self.session().query(self.model)
+        qs = query.filter(name__startswith='foo')
+        self.assertEqual(set((m.name for m in qs)),
+                         set(('foo', 'foobar', 'foofoo')))
+        for m in query.all():
+            m.save()
+        for key in keys:
+            self.assertEqual(client.zcard(key), len(self.names))
@@ -2,7 +2,7 @@ from stdnet.utils import test
 from stdnet.utils.populate import populate
 from stdnet.utils.py2py3 import zip
 
-from examples.models import NumericData
+from examples.models import NumericData, NumericIndexData
 from examples.data import data_generator
 
 
@@ -45,53 +45,53 @@ class TestNumericRange(NumericTest):
                 
     def testGT(self):
         session = self.session()
-        qs = session.query(NumericData).filter(pv__gt=1)
+        qs = session.query(self.model).filter(pv__gt=1)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv > 1)
-        qs = session.query(NumericData).filter(pv__gt=-2)
+        qs = session.query(self.model).filter(pv__gt=-2)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv > -2)
     
     def testGE(self):
         session = self.session()
-        qs = session.query(NumericData).filter(pv__ge=-2)
+        qs = session.query(self.model).filter(pv__ge=-2)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv >= -2)
-        qs = session.query(NumericData).filter(pv__ge=0)
+        qs = session.query(self.model).filter(pv__ge=0)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv >= 0)
             
     def testLT(self):
         session = self.session()
-        qs = session.query(NumericData).filter(pv__lt=2)
+        qs = session.query(self.model).filter(pv__lt=2)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv < 2)
-        qs = session.query(NumericData).filter(pv__lt=-1)
+        qs = session.query(self.model).filter(pv__lt=-1)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv < -1)
             
     def testLE(self):
         session = self.session()
-        qs = session.query(NumericData).filter(pv__le=1)
+        qs = session.query(self.model).filter(pv__le=1)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv <= 1)
-        qs = session.query(NumericData).filter(pv__le=-1)
+        qs = session.query(self.model).filter(pv__le=-1)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv <= -1)
             
     def testMix(self):
         session = self.session()
-        qs = session.query(NumericData).filter(pv__gt=1, pv__lt=0)
+        qs = session.query(self.model).filter(pv__gt=1, pv__lt=0)
         self.assertFalse(qs)
-        qs = session.query(NumericData).filter(pv__ge=-2, pv__lt=3)
+        qs = session.query(self.model).filter(pv__ge=-2, pv__lt=3)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv < 3)
@@ -99,7 +99,7 @@ class TestNumericRange(NumericTest):
         
     def testMoreThanOne(self):
         session = self.session()
-        qs = session.query(NumericData).filter(pv__ge=-2, pv__lt=3)\
+        qs = session.query(self.model).filter(pv__ge=-2, pv__lt=3)\
                                        .filter(vega__gt=0)
         self.assertTrue(qs)
         for v in qs:
@@ -107,30 +107,81 @@ class TestNumericRange(NumericTest):
             self.assertTrue(v.pv >= -2)
             self.assertTrue(v.vega > 0)
     
+    def testIntersectionOrder(self):
+        session = self.session()
+        qs = session.query(self.model).filter(pv__ge=0, vega__lt=0)\
+                                       .filter(ok=False)
+        expected = set((v.id for v in session.query(self.model).all()
+                        if v.pv >= 0 and v.vega < 0))
+        self.assertEqual(set((v.id for v in qs)), expected)
+        self.assertEqual(qs.count(), len(expected))
+        qs = session.query(self.model).filter(ok=True, pv__ge=0)
+        self.assertFalse(qs)
+    
     def testWithString(self):
         session = self.session()
-        qs = session.query(NumericData).filter(pv__ge='-2')
+        qs = session.query(self.model).filter(pv__ge='-2')
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.pv >= -2)
         
     def testJson(self):
         session = self.session()
-        qs = session.query(NumericData).filter(data__test__gt=1)
+        qs = session.query(self.model).filter(data__test__gt=1)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.data__test > 1)
-        qs = session.query(NumericData).filter(data__test__gt='-2')
+        qs = session.query(self.model).filter(data__test__gt='-2')
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.data__test > -2)
-        qs = session.query(NumericData).filter(data__test__inner__gt='1')
+        qs = session.query(self.model).filter(data__test__inner__gt='1')
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.data__test__inner > 1)
-        qs = session.query(NumericData).filter(data__test__inner__gt=-2)
+        qs = session.query(self.model).filter(data__test__inner__gt=-2)
         self.assertTrue(qs)
         for v in qs:
             self.assertTrue(v.data__test__inner > -2)
-            
-    
\ No newline at end of file
+
+
+class TestNumericRangeIndex(TestNumericRange):
+    multipledb = 'redis'
+    model = NumericIndexData
+    models = (NumericIndexData,)
+    
+    def testRangeIndex(self):
+        backend = self.backend
+        key = backend.basekey(self.model._meta, 'rng', 'pv')
+        self.assertEqual(backend.client.zcard(key),
+                         self.model.objects.query().count())
+        
+    def testIndexAndScan(self):
+        session = self.session()
+        qs = session.query(self.model).filter(pv__gt=-1, delta__lt=0)
+        for v in qs:
+            self.assertTrue(v.pv > -1)
+            self.assertTrue(v.delta < 0)
+    
+    def testIncompleteIndex(self):
+        # instances not in the range index are found by scanning the model
+        backend = self.backend
+        key = backend.basekey(self.model._meta, 'rng', 'pv')
+        instance = self.session().query(self.model).all()[0]
+        backend.client.zrem(key, instance.id)
+        qs = self.session().query(self.model).filter(pv__ge=instance.pv)
+        self.assertTrue(instance.id in set(v.id for v in qs))
+        instance.save()
+        self.assertEqual(backend.client.zscore(key, instance.id), instance.pv)
+    
+    def testSaveAgain(self):
+        # an instance committed before the range index was available is
+        # added to it when saved again, even if it did not change
+        backend = self.backend
+        key = backend.basekey(self.model._meta, 'rng', 'pv')
+        instance = self.session().query(self.model).all()[0]
+        backend.client.zrem(key, instance.id)
+        self.assertEqual(backend.client.zscore(key, instance.id), None)
+        instance = self.session().query(self.model).get(id=instance.id)
+        instance.save()
+        self.assertEqual(backend.client.zscore(key, instance.id), instance.pv)
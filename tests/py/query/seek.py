@@ -0,0 +1,117 @@
+'''Keyset pagination with the after and before query methods.'''
+from datetime import date
+
+from stdnet import QuerySetError
+from stdnet.utils import test, populate, zip
+
+from examples.models import SportAtDate, SortedPerson, Group
+
+NUM_DATES = 100
+
+dates = populate('date', NUM_DATES, start=date(2005,6,1), end=date(2010,6,6))
+names = populate('choice', NUM_DATES,
+                 choice_from=['football', 'rugby', 'swimming', 'running'])
+ages = populate('integer', NUM_DATES, start=1, end=30)
+
+
+class TestSeekOrdering(test.CleanTestCase):
+    multipledb = 'redis'
+    model = SportAtDate
+    
+    def setUp(self):
+        session = self.session()
+        with session.begin():
+            for n, d in zip(names, dates):
+                session.add(self.model(person='luca', name=n, dt=d))
+                
+    def key(self, o):
+        return (o.dt, str(o.id))
+        
+    def testAfter(self):
+        qs = self.session().query(self.model)
+        all = sorted(qs.all(), key=self.key)
+        page = qs[:10]
+        self.assertEqual(page, all[:10])
+        last = page[-1]
+        page = qs.after(last.dt, last.id)[:10]
+        self.assertEqual(page, all[10:20])
+        page = qs.after(last.dt, last.id)[5:10]
+        self.assertEqual(page, all[15:20])
+        self.assertEqual(qs.after(last.dt, last.id).count(), qs.count())
+        
+    def testAfterNoId(self):
+        qs = self.session().query(self.model)
+        all = sorted(qs.all(), key=self.key)
+        dt = all[20].dt
+        page = qs.after(dt).all()
+        self.assertEqual(page, [o for o in all if o.dt > dt])
+        
+    def testBefore(self):
+        qs = self.session().query(self.model)
+        all = sorted(qs.all(), key=self.key)
+        first = all[30]
+        page = qs.before(first.dt, first.id)[:10]
+        self.assertEqual(page, all[20:30])
+        page = qs.before(first.dt, first.id).all()
+        self.assertEqual(page, all[:30])
+        
+    def testDescending(self):
+        qs = self.session().query(self.model).sort_by('-dt')
+        all = sorted(qs.all(), key=self.key, reverse=True)
+        last = all[9]
+        self.assertEqual(qs.after(last.dt, last.id)[:10], all[10:20])
+        self.assertEqual(qs.before(last.dt, last.id)[:5], all[4:9])
+        
+    def testFilter(self):
+        qs = self.session().query(self.model).filter(name=('rugby', 'running'))
+        all = sorted(qs.all(), key=self.key)
+        self.assertTrue(len(all) > 5)
+        last = all[4]
+        page = qs.after(last.dt, last.id).all()
+        self.assertEqual(page, all[5:])
+        
+    def testIterator(self):
+        qs = self.session().query(self.model)
+        all = sorted(qs.all(), key=self.key)
+        last = all[10]
+        qs = qs.after(last.dt, last.id)
+        ids = [o.id for o in qs.iterator(batch_size=7)]
+        self.assertEqual(ids, [o.id for o in all[11:]])
+        
+    def testErrors(self):
+        qs = self.session().query(self.model)
+        self.assertRaises(QuerySetError, lambda: qs.after(date.today())[-2:])
+        qs = qs.sort_by('name').after('rugby')
+        self.assertRaises(QuerySetError, qs.all)
+    
+    
+class TestSeekSortIndex(test.CleanTestCase):
+    multipledb = 'redis'
+    model = SortedPerson
+    models = (SortedPerson, Group)
+    
+    def setUp(self):
+        session = self.session()
+        with session.begin():
+            for n in set(names):
+                session.add(Group(name=n))
+        groups = populate('choice', NUM_DATES, choice_from=session.query(Group))
+        with session.begin():
+            for a, g in zip(ages, groups):
+                session.add(self.model(name='luca', age=a, group=g))
+                
+    def testNumeric(self):
+        qs = self.session().query(self.model).sort_by('-age')
+        all = sorted(qs.all(), key=lambda o: (o.age, str(o.id)), reverse=True)
+        last = all[19]
+        self.assertEqual(qs.after(last.age, last.id)[:20], all[20:40])
+        self.assertEqual(qs.before(last.age, last.id)[:10], all[9:19])
+        
+    def testAlphanumeric(self):
+        qs = self.session().query(self.model).sort_by('group__name')
+        all = sorted(qs.all(), key=lambda o: (o.group.name, str(o.id)))
+        last = all[29]
+        page = qs.after(last.group.name, last.id)[:20]
+        self.assertEqual(page, all[30:50])
+        page = qs.after(last.group.name).all()
+        self.assertEqual(page, [o for o in all if o.group.name > last.group.name])
@@ -73,4 +73,34 @@ class TestFilter(FinanceTest):
         session = self.session()
         qs = session.query(self.model).get_field('id')
         self.assertRaises(QuerySetError, lambda: qs[:2])
-    
\ No newline at end of file
+            
+    def testSortedSliceAndCount(self):
+        '''A query not yet executed is counted when loading the slice.'''
+        session = self.session()
+        qs = session.query(self.model).sort_by('name')
+        N = qs.count()
+        bq = session.query(self.model).sort_by('name').backend_query()
+        self.assertFalse(bq.executed)
+        q1 = bq.items(slice(1, 3))
+        self.assertEqual(len(q1), 2)
+        self.assertTrue(bq.executed)
+        self.assertEqual(bq.count(), N)
+        q2 = qs[1:3]
+        self.assertEqual([q.id for q in q1], [q.id for q in q2])
+
+    def testIterator(self):
+        session = self.session()
+        qs = session.query(self.model)
+        ids = [m.id for m in qs.iterator(batch_size=3)]
+        self.assertEqual(len(ids), qs.count())
+        self.assertEqual(set(ids), set((m.id for m in qs)))
+        qs = session.query(self.model).filter(ccy='EUR')
+        ids = [m.id for m in qs.iterator(batch_size=2)]
+        self.assertEqual(sorted(ids), sorted((m.id for m in qs)))
+
+    def testSortedIterator(self):
+        session = self.session()
+        qs = session.query(self.model).sort_by('-name')
+        names = [m.name for m in qs.iterator(batch_size=4)]
+        self.assertEqual(names, [m.name for m in qs])
+        self.assertRaises(ValueError, lambda: list(qs.iterator(0)))
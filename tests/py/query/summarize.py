@@ -0,0 +1,74 @@
+'''Aggregates computed on the server with Query.summarize.'''
+from stdnet import QuerySetError
+from stdnet.utils import test
+
+from examples.models import Position, Fund
+from examples.data import FinanceTest
+
+
+class TestSummarize(FinanceTest):
+    multipledb = 'redis'
+    model = Position
+    
+    def setUp(self):
+        self.data.makePositions(self)
+        
+    def testCount(self):
+        qs = self.session().query(self.model)
+        self.assertEqual(qs.summarize('count'), {'count': qs.count()})
+        self.assertEqual(qs.summarize(), {})
+        
+    def testNumeric(self):
+        qs = self.session().query(self.model)
+        sizes = [p.size for p in qs]
+        summary = qs.summarize('count', 'size__count', 'size__sum',
+                               'size__avg', 'size__min', 'size__max')
+        self.assertEqual(summary['count'], len(sizes))
+        self.assertEqual(summary['size__count'], len(sizes))
+        self.assertAlmostEqual(summary['size__sum'], sum(sizes))
+        self.assertAlmostEqual(summary['size__avg'], sum(sizes)/len(sizes))
+        self.assertEqual(summary['size__min'], min(sizes))
+        self.assertEqual(summary['size__max'], max(sizes))
+        
+    def testDate(self):
+        qs = self.session().query(self.model)
+        dates = [p.dt for p in qs]
+        summary = qs.summarize('dt__min', 'dt__max')
+        self.assertEqual(summary, {'dt__min': min(dates),
+                                   'dt__max': max(dates)})
+        
+    def testFilter(self):
+        session = self.session()
+        fund = session.query(Fund).all()[0]
+        qs = session.query(self.model).filter(fund=fund)
+        sizes = [p.size for p in qs]
+        summary = qs.summarize('count', 'size__sum')
+        self.assertEqual(summary['count'], len(sizes))
+        self.assertAlmostEqual(summary['size__sum'], sum(sizes))
+        
+    def testEmpty(self):
+        qs = self.session().query(self.model).filter(id=-1)
+        summary = qs.summarize('count', 'size__sum', 'size__avg', 'size__max')
+        self.assertEqual(summary, {'count': 0, 'size__sum': 0,
+                                   'size__avg': None, 'size__max': None})
+        self.assertEqual(qs.summarize('count', group_by='fund'), {})
+        
+    def testGroupBy(self):
+        qs = self.session().query(self.model)
+        expected = {}
+        for p in qs:
+            sizes = expected.setdefault(p.fund_id, [])
+            sizes.append(p.size)
+        summary = qs.summarize('count', 'size__sum', group_by='fund')
+        self.assertEqual(len(summary), len(expected))
+        for fund_id, sizes in expected.items():
+            self.assertEqual(summary[fund_id]['count'], len(sizes))
+            self.assertAlmostEqual(summary[fund_id]['size__sum'], sum(sizes))
+        
+    def testErrors(self):
+        qs = self.session().query(self.model)
+        self.assertRaises(QuerySetError, qs.summarize, 'size__median')
+        self.assertRaises(QuerySetError, qs.summarize, 'foo__sum')
+        self.assertRaises(QuerySetError, qs.summarize, 'instrument__sum')
+        self.assertRaises(QuerySetError, qs.summarize, 'count', group_by='foo')
+        self.assertRaises(TypeError, qs.summarize, 'count', order_by='dt')
@@ -106,3 +106,43 @@ class TestUniqueFilter(test.CleanTestCase):
         self.assertRaises(ValueError,
                     query.test_unique,'code',m.code,m2,ValueError)
 
+
+class TestUniqueLoad(TestUniqueFilter):
+    '''Queries on the primary key or on a unique field only are loaded
+without building the query on the server.'''
+    multipledb = 'redis'
+    
+    def testGetNotBuilt(self):
+        query = self.session().query(self.model)
+        code = randomcode()
+        qs = query.filter(code=code)
+        obj = qs.get()
+        self.assertEqual(obj.code, code)
+        self.assertFalse(qs.backend_query().executed)
+        qs = query.filter(id=obj.id)
+        self.assertEqual(qs.all(), [obj])
+        self.assertFalse(qs.backend_query().executed)
+        
+    def testFilterCodeInMissing(self):
+        query = self.session().query(self.model)
+        codes = randomcode(num=3)
+        qs = query.filter(code__in=list(codes) + ['xxxxxxxxxx'])
+        self.assertEqual(set((m.code for m in qs)), codes)
+        self.assertFalse(qs.backend_query().executed)
+        self.assertEqual(qs.count(), 3)
+        self.assertRaises(self.model.DoesNotExist, query.get,
+                          code='xxxxxxxxxx')
+        
+    def testLoadOnly(self):
+        query = self.session().query(self.model)
+        code = randomcode()
+        obj = query.filter(code=code).load_only('group').get()
+        self.assertEqual(obj.group, dict(zip(codes, groups))[code])
+        self.assertFalse(hasattr(obj, 'description'))
+        
+    def testNotUnique(self):
+        query = self.session().query(self.model)
+        code = randomcode()
+        qs = query.filter(code=code, group=sports)
+        self.assertEqual(len(qs.all()), 1)
+        self.assertTrue(qs.backend_query().executed)
@@ -60,4 +60,29 @@ class PipelineTestCase(TestCase):
         request = pipe.request()
         self.assertTrue(request.is_pipeline)
         self.assertTrue(str(request).startswith('PIPELINE'))
+        
+    def test_large_values(self):
+        value = b'v'*100000
+        view = memoryview(bytearray(b'w'*50000))
+        for transaction in (True, False):
+            pipe = self.client.pipeline(transaction=transaction)
+            pipe.set('a', value).set('b', view).get('a').get('b')
+            self.assertEqual(pipe.execute(), [True, True, value, bytes(view)])
+        
+    def test_no_transaction(self):
+        pipe = self.client.pipeline(transaction=False)
+        self.assertFalse(pipe.transaction)
+        self.assertTrue(pipe.empty)
+        self.assertEqual(pipe.execute(), [])
+        self.client['c'] = 'a'
+        pipe.set('a', 'a1').get('a').lpush('c', 3).incr('b')
+        self.assertFalse(pipe.empty)
+        request = pipe.request()
+        self.assertEqual(len(request.args), 4)
+        result = request.execute()
+        self.assertEqual(result[:2], [True, b'a1'])
+        self.assertTrue(isinstance(result[2], redis.RedisInvalidResponse))
+        self.assertEqual(result[3], 1)
+        self.assertEqual(pipe.set('z', 'zzz').execute(), [True])
+        self.assertEqual(self.client['z'], b'zzz')
 
@@ -1,5 +1,8 @@
 import socket
+import time
+import threading
 
+from stdnet.conf import settings
 from stdnet.utils.test import mock
 
 from .base import TestCase, redis
@@ -17,7 +20,7 @@ def write_mock():
 
 def read_mock():
     parent = mock.MagicMock()
-    parent.recv = mock.MagicMock(side_effect=socket.error)
+    parent.recv_into = mock.MagicMock(side_effect=socket.error)
     parent.close = mock.MagicMock(side_effect=socket.error)
     return parent
 
@@ -55,6 +58,35 @@ class ConnectionPoolTestCase(TestCase):
         c2 = pool.get_connection()
         self.assertRaises(redis.RedisConnectionError, pool.get_connection)
 
+    def test_blocking_timeout(self):
+        pool = self.get_pool(max_connections=1, blocking_timeout=0.1)
+        self.assertEqual(pool.blocking_timeout, 0.1)
+        c1 = pool.get_connection()
+        self.assertRaises(redis.RedisConnectionError, pool.get_connection)
+        threading.Timer(0.05, pool.release, (c1,)).start()
+        self.assertEqual(pool.get_connection(), c1)
+        
+    def test_idle_timeout(self):
+        pool = self.get_pool(idle_timeout=0.01)
+        c1 = pool.get_connection()
+        pool.release(c1)
+        time.sleep(0.02)
+        c2 = pool.get_connection()
+        self.assertNotEqual(c1, c2)
+        self.assertEqual(pool._created_connections, 1)
+        
+    def test_health_check(self):
+        pool = self.get_pool(health_check_interval=0)
+        c1 = pool.get_connection()
+        sock, other = socket.socketpair()
+        c1._sock = sock
+        pool.release(c1)
+        self.assertEqual(pool.get_connection().sock, sock)
+        pool.release(c1)
+        other.close()
+        self.assertEqual(pool.get_connection(), c1)
+        self.assertEqual(c1.sock, None)
+        
     def test_release(self):
         pool = self.get_pool()
         c1 = pool.get_connection()
@@ -62,6 +94,25 @@ class ConnectionPoolTestCase(TestCase):
         c2 = pool.get_connection()
         self.assertEquals(c1, c2)
         
+    def test_pack_command(self):
+        connection = self.get_pool().get_connection()
+        self.assertEqual(connection.pack_command('SET', 'a', 3.5),
+                         b'*3\r\n$3\r\nSET\r\n$1\r\na\r\n$3\r\n3.5\r\n')
+        self.assertEqual(connection.pack_command('SET', 'a',
+                                                 memoryview(b'xy')),
+                         b'*3\r\n$3\r\nSET\r\n$1\r\na\r\n$2\r\nxy\r\n')
+        
+    def test_pack_pipeline(self):
+        connection = self.get_pool().get_connection()
+        value = b'x'*connection.zero_copy_size
+        commands = self.client.pipeline(transaction=False)\
+                              .set('a', value).get('a').command_stack
+        chunks = connection.pack_pipeline(commands)
+        self.assertEqual(len(chunks), 3)
+        self.assertTrue(chunks[1] is value)
+        self.assertTrue(chunks[0].endswith(
+                            ('$%s\r\n' % len(value)).encode('ascii')))
+        
     def test_redisRequest(self):
         rpy = redis.Redis(self.get_pool())
         request = rpy.request('PING')
@@ -73,6 +124,36 @@ class ConnectionPoolTestCase(TestCase):
         self.assertEqual(request.raw_response, b'')
         self.assertEqual(str(request), 'PING()')
     
+    def test_raw_response(self):
+        request = self.client.request('PING')
+        self.assertTrue(request.execute())
+        self.assertEqual(request.raw_response, b'')
+        settings.REDIS_RAW_RESPONSE = True
+        try:
+            request = self.client.request('PING')
+            self.assertTrue(request.execute())
+            self.assertEqual(request.raw_response, b'+PONG\r\n')
+        finally:
+            settings.REDIS_RAW_RESPONSE = False
+            
+    def test_read_buffer(self):
+        value = b'x'*200000
+        self.client.set('a', value)
+        request = self.client.request('GET', 'a')
+        connection = request.connection
+        self.assertEqual(request.execute(), value)
+        self.assertTrue(len(connection._read_buffer) >
+                        connection.READ_BUFFER_SIZE)
+        self.assertTrue(len(connection._read_buffer) <=
+                        connection.MAX_READ_BUFFER_SIZE)
+        
+    def testFailRead(self):
+        request = self.client.request('PING')
+        request.retry = 1
+        request.connection._sock = read_mock()
+        self.assertRaises(socket.error, request.execute)
+        self.assertEqual(request.connection, None)
+        
     def testFailWrite(self):
         request = self.client.request('PING')
         request.connection._sock = write_mock()
@@ -1,4 +1,5 @@
 '''Sessions and transactions management'''
+import stdnet
 from stdnet import odm, getdb
 
 from stdnet.utils import test
@@ -96,4 +97,57 @@ class TestLongSessions(test.CleanTestCase):
     
     def __testCreate(self):
         session.begin()
-    
\ No newline at end of file
+
+class TestChangedFields(test.CleanTestCase):
+    '''Persistent instances commit the fields changed since they were
+loaded or committed.'''
+    multipledb = 'redis'
+    model = SimpleModel
+    
+    def setUp(self):
+        session = self.session()
+        with session.begin():
+            session.add(SimpleModel(code='pluto', group='planet',
+                                    description='small'))
+        
+    def testConcurrentChanges(self):
+        el1 = self.session().query(self.model).get(code='pluto')
+        el2 = self.session().query(self.model).get(code='pluto')
+        el1.group = 'dwarf'
+        el1.save()
+        el2.description = 'far'
+        el2.save()
+        el = self.session().query(self.model).get(code='pluto')
+        self.assertEqual(el.group, 'dwarf')
+        self.assertEqual(el.description, 'far')
+        qs = self.session().query(self.model)
+        self.assertEqual(qs.filter(group='dwarf').count(), 1)
+        self.assertEqual(qs.filter(group='planet').count(), 0)
+        
+    def testLoaded(self):
+        el = self.session().query(self.model).get(code='pluto')
+        self.assertTrue(el._dbdata['loaded'])
+        el.group = None
+        el.save()
+        self.assertEqual(el._dbdata['loaded'], el._dbdata['cleaned_data'])
+        el = self.session().query(self.model).get(code='pluto')
+        self.assertEqual(el.group, None)
+        self.assertEqual(el.description, 'small')
+        
+    def testLoadOnly(self):
+        el = self.session().query(self.model).load_only('group').get(
+                                                                code='pluto')
+        el.group = None
+        el.save()
+        el = self.session().query(self.model).get(code='pluto')
+        self.assertEqual(el.group, None)
+        self.assertEqual(el.description, 'small')
+        
+    def testUnique(self):
+        session = self.session()
+        session.add(SimpleModel(code='venus'))
+        el = self.session().query(self.model).get(code='pluto')
+        el.code = 'venus'
+        self.assertRaises(stdnet.CommitException, el.save)
+        el = self.session().query(self.model).get(code='pluto')
+        self.assertEqual(el.group, 'planet')
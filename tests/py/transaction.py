@@ -1,6 +1,6 @@
 import random
 
-from stdnet import odm, InvalidTransaction
+from stdnet import odm, InvalidTransaction, CommitException
 from examples.models import SimpleModel, Dictionary
 from stdnet.utils import test, populate
 
@@ -103,4 +103,45 @@ class TestMultiFieldTransaction(test.CleanTestCase):
         self.assertEqual(d1.data['ciao'],'hello in Italian')
         self.assertEqual(d2.data['wine'],'drink to enjoy with or without food')
     
-    
\ No newline at end of file
+    
+class TestCommitBatches(test.CleanTestCase):
+    multipledb = 'redis'
+    model = SimpleModel
+    
+    def setUp(self):
+        self.register()
+        
+    def add(self, t, size=10):
+        for n in range(size):
+            t.add(self.model(code='test%s' % n, description='batch'))
+        
+    def testBatches(self):
+        session = self.session()
+        receiver = TransactionReceiver()
+        odm.post_commit.connect(receiver, self.model)
+        with session.begin(max_commit_batch=3) as t:
+            self.assertEqual(t.max_commit_batch, 3)
+            self.assertFalse(t.atomic)
+            self.add(t)
+        self.assertEqual(len(t.saved[self.model._meta]), 10)
+        self.assertEqual(len(receiver.transactions), 1)
+        sender, instances = receiver.transactions[0]
+        self.assertEqual(len(instances), 10)
+        self.assertEqual(session.query(self.model).count(), 10)
+        
+    def testAtomicBatches(self):
+        session = self.session()
+        with session.begin(max_commit_batch=4, atomic=True) as t:
+            self.add(t)
+        self.assertEqual(len(t.saved[self.model._meta]), 10)
+        self.assertEqual(session.query(self.model).count(), 10)
+        
+    def testBatchErrors(self):
+        session = self.session()
+        with session.begin() as t:
+            t.add(self.model(code='test5', description='taken'))
+        t = session.begin(max_commit_batch=3)
+        self.add(t)
+        self.assertRaises(CommitException, t.commit)
+        # all instances but the duplicate one are committed
+        self.assertEqual(session.query(self.model).count(), 10)